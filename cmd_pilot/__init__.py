@@ -2,9 +2,9 @@
 CMD-Pilot - AI-powered command line assistant
 """
 
-from .core.command_engine import CommandEngine
-from .core.security import CommandValidator
-from .core.error_handler import ErrorHandler
+from .command_engine import CommandEngine
+from .utils.security import CommandValidator
+from .utils.error_handler import ErrorHandler
 from .ui.main_window import ModernUI
 
 __all__ = [
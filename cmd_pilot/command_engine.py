@@ -1,28 +1,277 @@
 import os
+import re
+import sys
+import json
+import random
+import shlex
+import hashlib
 import platform
 import asyncio
+import atexit
 import tempfile
+from collections import OrderedDict, deque
 from typing import Any, Dict, List, Optional, Tuple, TypedDict, Union
 from functools import partial, lru_cache
 import logging
+import httpx
 from cmd_pilot.config import MODEL_CONFIGS
 from cmd_pilot.utils.error_handler import ErrorHandler
 from cmd_pilot.utils.security import CommandValidator, SecurityError
 
+# Linux上uvloop显著降低子进程/网络I/O的每次调用开销，可选依赖
+try:
+    import uvloop
+    uvloop.install()
+except ImportError:
+    pass
+
+# 共享HTTP连接池，所有引擎实例复用同一个异步客户端。
+# keepalive_expiry=60拉长保活窗口，第二次及以后的请求免TLS握手
+_HTTP_LIMITS = httpx.Limits(
+    max_connections=100, max_keepalive_connections=20, keepalive_expiry=60
+)
+# HTTP/2可多路复用生成/分析请求到一条连接；缺h2包时退回HTTP/1.1
+try:
+    import h2  # noqa: F401
+    _HTTP2 = True
+except ImportError:
+    _HTTP2 = False
+_http_client: Optional[httpx.AsyncClient] = None
+
+def _get_http_client() -> httpx.AsyncClient:
+    """Lazily create the shared async HTTP client (connection pooled)"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=30, limits=_HTTP_LIMITS, http2=_HTTP2
+        )
+    return _http_client
+
+# 子进程输出按字节读取、结束时一次解码；Windows控制台默认GBK
+_OUTPUT_ENCODING = 'gbk' if sys.platform.startswith('win') else 'utf-8'
+# StreamReader缓冲上限：1MB让大输出命令少触发流控暂停/恢复
+_SUBPROCESS_BUFFER_LIMIT = 1024 * 1024
+# 单条命令执行截止时间（秒），超时杀进程并回收
+_EXEC_TIMEOUT = 60
+
+# 响应缓存容量：同模型同消息序列的重复请求直接命中，零token开销
+_RESPONSE_CACHE_SIZE = 256
+
+# 语义缓存：近似改写（"列出当前目录"/"显示此文件夹内容"）也应命中。
+# 无外部embedding模型依赖，用字符3-gram向量的余弦相似度近似
+_SEMANTIC_CACHE_SIZE = 256
+_SEMANTIC_THRESHOLD = 0.92
+
+
+def _ngram_vector(text: str, n: int = 3) -> Tuple[Dict[str, int], float]:
+    """归一化文本的字符n-gram计数向量及其L2范数"""
+    normalized = ' '.join(text.lower().split())
+    counts: Dict[str, int] = {}
+    for i in range(max(len(normalized) - n + 1, 1)):
+        gram = normalized[i:i + n]
+        counts[gram] = counts.get(gram, 0) + 1
+    norm = sum(v * v for v in counts.values()) ** 0.5
+    return counts, norm
+
+
+def _cosine(a: Dict[str, int], an: float, b: Dict[str, int], bn: float) -> float:
+    if not an or not bn:
+        return 0.0
+    if len(b) < len(a):
+        a, b = b, a
+    dot = sum(v * b.get(k, 0) for k, v in a.items())
+    return dot / (an * bn)
+
+
+# 查询中的操作数token（文件名/路径/参数/数字等ASCII串）。
+# 长查询只改一个操作数时trigram相似度仍很高，但生成的命令完全
+# 不同——语义命中前要求操作数多重集合精确一致，宁可缓存未命中
+# 也不能返回指向错误文件的命令
+_OPERAND_TOKEN_RE = re.compile(r'[A-Za-z0-9_.\-/]+')
+
+
+def _operand_signature(text: str) -> Tuple[str, ...]:
+    """归一化查询的ASCII操作数多重集合（排序元组，可比较）"""
+    return tuple(sorted(_OPERAND_TOKEN_RE.findall(text.lower())))
+
+# 磁盘缓存层：SQLite持久化响应，跨进程重启仍可命中（~100µs对比
+# 一次网络往返）。标准库sqlite3即可，不引入diskcache依赖
+_DISK_CACHE_PATH = os.path.expanduser('~/.cmdpilot/cache.db')
+_DISK_CACHE_TTL = 7 * 86400  # 一周过期
+_disk_cache_conn = None
+_disk_cache_lock = None
+
+
+def _get_disk_cache():
+    """懒初始化磁盘缓存连接；失败时返回None，调用方静默跳过"""
+    global _disk_cache_conn, _disk_cache_lock
+    if _disk_cache_conn is None:
+        import sqlite3
+        import threading
+        import time
+        try:
+            os.makedirs(os.path.dirname(_DISK_CACHE_PATH), exist_ok=True)
+            conn = sqlite3.connect(_DISK_CACHE_PATH, check_same_thread=False)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, value TEXT, expires REAL)"
+            )
+            # 启动时顺手清掉过期行，库体积随TTL有界
+            conn.execute(
+                "DELETE FROM responses WHERE expires < ?", (time.time(),)
+            )
+            conn.commit()
+            _disk_cache_conn = conn
+            _disk_cache_lock = threading.Lock()
+        except Exception:
+            return None
+    return _disk_cache_conn
+
+
+def _disk_cache_get(key: str) -> Optional[Dict[str, Any]]:
+    conn = _get_disk_cache()
+    if conn is None:
+        return None
+    import time
+    try:
+        with _disk_cache_lock:
+            row = conn.execute(
+                "SELECT value, expires FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return json.loads(row[0])
+    except Exception:
+        return None
+
+
+def _disk_cache_put(key: str, result: Dict[str, Any]) -> None:
+    conn = _get_disk_cache()
+    if conn is None:
+        return
+    import time
+    try:
+        with _disk_cache_lock:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?)",
+                (key, json.dumps(result), time.time() + _DISK_CACHE_TTL)
+            )
+            conn.commit()
+    except Exception:
+        pass  # 磁盘缓存故障绝不影响请求主路径
+
+# 上下文保留的最大消息数（5轮user/assistant对），deque自动逐出
+_CONTEXT_MAX_MESSAGES = 10
+# 上下文字符预算：单条超长消息也会触发截断，输入token随会话有界。
+# 中英混合语料下字符数与token数同量级，足以做预算控制
+_CONTEXT_CHAR_BUDGET = 8000
+
+# 进程生命周期内操作系统不变，uname/stat只在导入时做一次
+_OS_TYPE = platform.system()
+
+# 系统提示静态部分：必须保持字节级不变，服务端prompt前缀缓存
+# 按精确前缀命中（静态内容在前，动态信息只追加在末尾）
+_SYSTEM_PROMPT_STATIC = """你是一个命令行工具生成器，根据用户需求生成安全可靠的系统命令。
+规则:
+1. 只生成实际可执行的命令
+2. 对危险操作必须添加警告注释
+3. 优先使用跨平台兼容的命令"""
+
+# 模块导入时构建一次，所有引擎实例共享同一个system消息对象
+_SYSTEM_MESSAGE = {
+    "role": "system",
+    "content": _SYSTEM_PROMPT_STATIC + f"\n当前操作系统: {_OS_TYPE}",
+}
+
+# 风险等级常量：按严重程度降序；分值表供执行阈值比较
+_RISK_ORDER = ('critical', 'high', 'medium')
+_RISK_SCORE = {'critical': 3, 'high': 2, 'medium': 1, 'low': 0}
+
+# 模块级OpenAI客户端缓存：同一(base_url, key)的引擎实例共享连接池
+_openai_clients: Dict[tuple, Any] = {}
+
+def _get_async_openai_client(api_key: str, base_url: str):
+    key = (api_key, base_url)
+    client = _openai_clients.get(key)
+    if client is None:
+        from openai import AsyncOpenAI
+        # 复用共享httpx客户端：继承其连接池/keep-alive/HTTP2配置，
+        # 而非OpenAI默认的独立HTTP/1.1小池
+        client = AsyncOpenAI(
+            api_key=api_key, base_url=base_url,
+            http_client=_get_http_client()
+        )
+        _openai_clients[key] = client
+    return client
+
 class CommandContext:
-    """Context manager for command execution environment"""
+    """Context manager for command execution environment
+
+    不再chdir进程本身，而是暴露隔离的临时目录供subprocess的
+    cwd=参数使用；退出时自动清理，不泄漏临时目录。
+    """
     def __init__(self):
         self.env = os.environ.copy()
-        self.cwd = os.getcwd()
-        self.umask = os.umask(0o077)  # 设置严格默认权限
-        os.umask(self.umask)  # 还原原始umask
+        self.cwd = None  # 进入上下文后指向隔离工作目录
+        self._tmpdir = None
+        self._old_umask = None
+        self._depth = 0  # 可重入：嵌套enter不重复建目录/改umask
 
     def __enter__(self):
-        os.chdir(tempfile.mkdtemp())  # 进入临时目录
+        self._depth += 1
+        if self._depth == 1:
+            self._old_umask = os.umask(0o077)  # 子进程继承严格默认权限
+            self._tmpdir = tempfile.TemporaryDirectory()
+            self.cwd = self._tmpdir.name
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        os.chdir(self.cwd)  # 还原原始目录
+        self._depth -= 1
+        if self._depth > 0:
+            return
+        try:
+            if self._tmpdir is not None:
+                self._tmpdir.cleanup()
+                self._tmpdir = None
+        finally:
+            os.umask(self._old_umask)  # 还原原始umask
+
+class _FenceParser:
+    """增量解析```围栏的小型状态机，流式响应边到边提取命令"""
+
+    def __init__(self):
+        self._pending = ""
+        self._in_fence = False
+        self._blocks = []
+        self._current = []
+
+    def feed(self, chunk: str) -> None:
+        buf = self._pending + chunk
+        while True:
+            idx = buf.find('```')
+            if idx == -1:
+                break
+            if self._in_fence:
+                self._current.append(buf[:idx])
+                self._blocks.append(''.join(self._current))
+                self._current = []
+            self._in_fence = not self._in_fence
+            buf = buf[idx + 3:]
+        # 保留尾部可能被截断的围栏标记，等下一个chunk拼上
+        keep = 2 if buf.endswith('``') else 1 if buf.endswith('`') else 0
+        if self._in_fence:
+            self._current.append(buf[:len(buf) - keep] if keep else buf)
+        self._pending = buf[len(buf) - keep:] if keep else ""
+
+    def command(self) -> str:
+        """返回最后一个闭合代码块内的命令"""
+        if not self._blocks:
+            return ""
+        block = self._blocks[-1]
+        if block.startswith(('bash\n', 'shell\n')):
+            block = block.split('\n', 1)[1]
+        return block.strip()
+
 
 class CommandEngine:
     """Enhanced command engine with AI generation and security validation"""
@@ -33,7 +282,27 @@ class CommandEngine:
         self.model_id = model_id
         self.config = MODEL_CONFIGS[model_id]
         self._validate_env()
+        # _validate_env已确认存在，此后不再每次请求查os.environ
+        self._api_key = os.getenv(self.config['env_vars'][0])
+        self._openai_client = None  # 首次使用时从模块级缓存解析
         self.validator = CommandValidator()
+        # 多轮上下文：system提示单独保存，deque(maxlen)自动逐出旧轮次，
+        # 免去每轮"[system] + 切片"的整表复制
+        self.context: deque = deque(maxlen=_CONTEXT_MAX_MESSAGES)
+        # 常驻执行上下文：隔离目录等昂贵搭建只做一次，命令间复用
+        self._exec_ctx: Optional[CommandContext] = None
+        # LRU响应缓存：键为(模型, 完整消息序列)的摘要
+        self._response_cache: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        # 语义缓存：(查询向量, 范数, 结果)，deque自动FIFO淘汰
+        self._semantic_cache: deque = deque(maxlen=_SEMANTIC_CACHE_SIZE)
+        # 系统信息已并入system消息尾部，每轮user消息不再重复携带
+        self._system_message = _SYSTEM_MESSAGE
+        self._query_template = """根据以下要求生成系统命令:
+[用户需求] {query}
+[解释] 命令作用和注意事项
+[命令] ```shell
+实际命令```
+要求：简洁、安全、对高危操作警告"""
 
     def _validate_env(self):
         """Validate required environment variables"""
@@ -43,32 +312,84 @@ class CommandEngine:
 
     def _prepare_query_with_context(self, query: str) -> str:
         """Prepare query with system context"""
-        return f"""根据以下要求生成系统命令:
-[上下文] 当前系统: {platform.system()}
-[用户需求] {query}
-[解释] 命令作用和注意事项
-[命令] ```shell
-实际命令```
-要求：简洁、安全、对高危操作警告"""
+        return self._query_template.format(query=query)
 
     def _build_system_message(self) -> Dict[str, str]:
         """Build system message for AI command generation"""
-        return {
-            "role": "system",
-            "content": """你是一个命令行工具生成器，根据用户需求生成安全可靠的系统命令。
-规则:
-1. 只生成实际可执行的命令
-2. 对危险操作必须添加警告注释
-3. 优先使用跨平台兼容的命令"""
-        }
+        return self._system_message
+
+    def _record_turn(self, user_msg: Dict[str, str], raw_response: str) -> None:
+        """记录一轮对话并按字符预算截断最旧轮次
+
+        system提示固定在消息序列最前（字节级稳定前缀），服务端的
+        prompt前缀缓存每轮都能命中。
+        """
+        self.context.append(user_msg)
+        self.context.append({"role": "assistant", "content": raw_response})
+        total = sum(len(m["content"]) for m in self.context)
+        while total > _CONTEXT_CHAR_BUDGET and len(self.context) >= 2:
+            # 成对（user+assistant）丢弃最旧轮次
+            total -= len(self.context.popleft()["content"])
+            total -= len(self.context.popleft()["content"])
+
+    def _semantic_lookup(
+        self,
+        query_vec: Dict[str, int],
+        query_norm: float,
+        signature: Tuple[str, ...],
+    ) -> Optional[Dict[str, Any]]:
+        """余弦相似度超过阈值的最近查询结果；无命中返回None
+
+        操作数签名必须精确一致：近似改写可以命中，换了文件名/
+        参数/数字的查询绝不能拿到旧命令。
+        """
+        best, best_sim = None, _SEMANTIC_THRESHOLD
+        for vec, norm, sig, result in self._semantic_cache:
+            if sig != signature:
+                continue
+            sim = _cosine(query_vec, query_norm, vec, norm)
+            if sim >= best_sim:
+                best, best_sim = result, sim
+        return best
+
+    def _response_cache_key(self, messages: List[Dict[str, str]]) -> str:
+        """模型+消息序列的稳定摘要，同请求同历史即命中"""
+        payload = json.dumps(
+            {"model": self.config['model'], "messages": messages},
+            sort_keys=True, ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
 
     async def async_generate_command(self, query: str) -> Dict[str, Any]:
         """Generate command using AI with async support"""
-        messages = [
-            self._build_system_message(),
-            {"role": "user", "content": self._prepare_query_with_context(query)}
-        ]
-        
+        user_msg = {"role": "user", "content": self._prepare_query_with_context(query)}
+        messages = [self._build_system_message(), *self.context, user_msg]
+
+        # 命中缓存：跳过整个HTTP往返，不消耗token
+        cache_key = self._response_cache_key(messages)
+        cached = self._response_cache.get(cache_key)
+        if cached is not None:
+            self._response_cache.move_to_end(cache_key)
+            self._record_turn(user_msg, cached["raw"])
+            return dict(cached)
+
+        # 语义缓存：近似改写的重复请求同样免去LLM调用
+        query_vec, query_norm = _ngram_vector(query)
+        query_sig = _operand_signature(query)
+        hit = self._semantic_lookup(query_vec, query_norm, query_sig)
+        if hit is not None:
+            self._record_turn(user_msg, hit["raw"])
+            return dict(hit)
+
+        # 磁盘缓存：上次会话见过的请求免API调用，顺带回填内存层
+        disk_hit = _disk_cache_get(cache_key)
+        if disk_hit is not None:
+            self._response_cache[cache_key] = dict(disk_hit)
+            if len(self._response_cache) > _RESPONSE_CACHE_SIZE:
+                self._response_cache.popitem(last=False)
+            self._record_turn(user_msg, disk_hit["raw"])
+            return disk_hit
+
         try:
             if self.config['api_type'] == 'openai':
                 raw_response = await self._call_openai_api(messages)
@@ -79,11 +400,20 @@ class CommandEngine:
             
             # 清理输出并提取命令
             sanitized = self._sanitize_output(raw_response)
-            return {
+            self._record_turn(user_msg, raw_response)
+            result = {
                 "sanitized": sanitized,
                 "raw": raw_response,
                 "error": None
             }
+            self._response_cache[cache_key] = dict(result)
+            if len(self._response_cache) > _RESPONSE_CACHE_SIZE:
+                self._response_cache.popitem(last=False)
+            self._semantic_cache.append(
+                (query_vec, query_norm, query_sig, dict(result))
+            )
+            _disk_cache_put(cache_key, result)
+            return result
         except Exception as e:
             return {
                 "sanitized": "",
@@ -93,93 +423,274 @@ class CommandEngine:
 
     def _sanitize_output(self, text: str) -> str:
         """清理API响应，提取命令部分"""
-        code_blocks = re.findall(r'```(?:bash|shell)?\n(.*?)```', text, re.DOTALL)
+        # 固定分隔符```用str.split即可，避免每次响应跑正则引擎
+        parts = text.split('```') if text else []
+        # 奇数段数说明所有代码块均闭合；偶数段数时末段未闭合，丢弃
+        code_blocks = parts[1::2] if len(parts) % 2 else parts[1:-1:2]
         if code_blocks:
-            return code_blocks[-1].strip()
+            block = code_blocks[-1]
+            if block.startswith(('bash\n', 'shell\n')):
+                block = block.split('\n', 1)[1]
+            return block.strip()
         return text.splitlines()[-1].strip() if text else ""
 
+    async def async_generate_command_stream(
+        self, query: str, on_delta=None
+    ) -> Dict[str, Any]:
+        """流式生成命令：增量解析围栏，on_delta可用于UI实时展示
+
+        仅openai类API支持流式；其他API类型回退到整体生成。
+        """
+        if self.config['api_type'] != 'openai':
+            return await self.async_generate_command(query)
+
+        user_msg = {"role": "user", "content": self._prepare_query_with_context(query)}
+        messages = [self._build_system_message(), *self.context, user_msg]
+
+        # 与整体生成路径共享全部缓存层；命中时整段经on_delta回放，
+        # UI行为与流式一致但零API开销
+        cache_key = self._response_cache_key(messages)
+        query_vec, query_norm = _ngram_vector(query)
+        query_sig = _operand_signature(query)
+        cached = self._response_cache.get(cache_key)
+        if cached is not None:
+            self._response_cache.move_to_end(cache_key)
+        else:
+            cached = _disk_cache_get(cache_key)
+            if cached is not None:
+                self._response_cache[cache_key] = dict(cached)
+                if len(self._response_cache) > _RESPONSE_CACHE_SIZE:
+                    self._response_cache.popitem(last=False)
+        if cached is None:
+            cached = self._semantic_lookup(query_vec, query_norm, query_sig)
+        if cached is not None:
+            if on_delta is not None:
+                on_delta(cached["raw"])
+            self._record_turn(user_msg, cached["raw"])
+            return dict(cached)
+
+        try:
+            client = self._get_openai_client()
+            stream = await client.chat.completions.create(
+                model=self.config['model'],
+                messages=messages,
+                stream=True
+            )
+            raw_parts = []
+            parser = _FenceParser()
+            async for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if not delta:
+                    continue
+                raw_parts.append(delta)
+                parser.feed(delta)
+                if on_delta is not None:
+                    on_delta(delta)
+
+            raw_response = ''.join(raw_parts)
+            # 流结束时解析器里已是提取好的命令，无闭合块时走原兜底逻辑
+            sanitized = parser.command() or self._sanitize_output(raw_response)
+            self._record_turn(user_msg, raw_response)
+            result = {
+                "sanitized": sanitized,
+                "raw": raw_response,
+                "error": None
+            }
+            self._response_cache[cache_key] = dict(result)
+            if len(self._response_cache) > _RESPONSE_CACHE_SIZE:
+                self._response_cache.popitem(last=False)
+            self._semantic_cache.append(
+                (query_vec, query_norm, query_sig, dict(result))
+            )
+            _disk_cache_put(cache_key, result)
+            return result
+        except Exception as e:
+            return {
+                "sanitized": "",
+                "raw": None,
+                "error": str(e)
+            }
+
     def generate_command(self, query: str) -> Dict[str, str]:
         """Synchronous version of command generation"""
-        loop = asyncio.get_event_loop()
-        return loop.run_until_complete(self.async_generate_command(query))
+        # 始终提交到常驻后台循环：共享的httpx/AsyncOpenAI客户端把
+        # 连接池绑定在首个使用它的循环上，asyncio.run的一次性循环
+        # 会在退出时关闭这些连接，后续同步调用报"Event loop is
+        # closed"；统一落在同一个循环上也避免嵌套循环问题
+        from cmd_pilot.utils.async_executor import get_shared_executor
+        future = get_shared_executor().run_coroutine(
+            self.async_generate_command(query)
+        )
+        return future.result()
+
+    async def generate_batch(self, queries: List[str]) -> List[Dict[str, Any]]:
+        """Generate commands for multiple queries concurrently"""
+        return await asyncio.gather(
+            *[self.async_generate_command(q) for q in queries]
+        )
 
     def _get_highest_risk_level(self, risk_assessment):
         """获取最高风险等级"""
-        for level in ['critical', 'high', 'medium']:
-            if level in risk_assessment:
-                return level
-        return 'low'
+        return next(
+            (lvl for lvl in _RISK_ORDER if lvl in risk_assessment), 'low'
+        )
 
     async def async_execute(self, query: str) -> Dict[str, str]:
         """Execute command with enhanced security validation"""
         try:
             command_data = await self.async_generate_command(query)
-            sanitized = self.validator.sanitize_command(command_data['command'])
-            
-            if not self.validator.is_safe(sanitized):
-                risk = self.validator.assess_risk(sanitized)
-                highest_level = self._get_highest_risk_level(risk)
-                risk_order = {'critical':3, 'high':2, 'medium':1, 'low':0}
-                if risk_order[highest_level] > risk_order.get(self.config.get('max_risk_level', 'medium'), 1):
-                    raise SecurityError("命令风险过高", command=sanitized, risk_level=highest_level)
+            sanitized = self.validator.sanitize_command(command_data['sanitized'])
+
+            # 单次记忆化分析，UI校验/执行路径共享同一结果
+            from cmd_pilot.utils.security import analyze
+            analysis = analyze(sanitized)
+            if not analysis.safe:
+                if _RISK_SCORE[analysis.risk_level] > _RISK_SCORE.get(self.config.get('max_risk_level', 'medium'), 1):
+                    raise SecurityError("命令风险过高", command=sanitized, risk_level=analysis.risk_level)
             
-            with CommandContext():
-                return await self._execute_command(sanitized)
-                
+            return await self._execute_command(
+                sanitized, self._get_exec_context()
+            )
+
         except Exception as e:
             ErrorHandler.log_error(e, "COMMAND_EXECUTION_FAILED")
             raise
 
-    def _execute_command(self, command: str) -> Dict[str, str]:
-        """Actual command execution logic"""
-        # Implementation would go here
+    def _get_exec_context(self) -> CommandContext:
+        """懒创建并常驻的执行上下文
+
+        每条命令新建/清理临时目录的系统调用开销往往超过短命令本身；
+        这里进入一次后跨命令复用，close()时统一清理。
+        """
+        if self._exec_ctx is None:
+            ctx = CommandContext()
+            ctx.__enter__()
+            self._exec_ctx = ctx
+            # UI没走正常关闭流程时兜底清理；close()幂等，重复注册无害
+            atexit.register(self.close)
+        return self._exec_ctx
+
+    def close(self) -> None:
+        """释放常驻执行上下文（应用退出或引擎淘汰时调用）"""
+        if self._exec_ctx is not None:
+            self._exec_ctx.__exit__(None, None, None)
+            self._exec_ctx = None
+
+    async def _execute_command(
+        self, command: str, ctx: Optional[CommandContext] = None
+    ) -> Dict[str, str]:
+        """Actual command execution logic (non-blocking subprocess)"""
+        argv = shlex.split(command)
+        if not argv:
+            return {"output": "", "status": "error", "command": command}
+
+        # argv列表执行，永不经过shell
+        proc = await asyncio.create_subprocess_exec(
+            *argv,
+            cwd=ctx.cwd if ctx else None,
+            env=ctx.env if ctx else None,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            limit=_SUBPROCESS_BUFFER_LIMIT
+        )
+        # communicate在事件循环内并发排空双管道（无读线程、无管道
+        # 写满死锁）；wait_for补上截止时间，超时杀掉并等待回收
+        try:
+            stdout, stderr = await asyncio.wait_for(
+                proc.communicate(), timeout=_EXEC_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            try:
+                proc.kill()
+            except ProcessLookupError:
+                pass
+            await proc.wait()
+            return {
+                "output": f"命令执行超时（{_EXEC_TIMEOUT}秒）",
+                "status": "error",
+                "command": command
+            }
+        output = stdout.decode(_OUTPUT_ENCODING, errors='replace').strip()
+        if proc.returncode != 0:
+            error_text = stderr.decode(_OUTPUT_ENCODING, errors='replace').strip()
+            return {
+                "output": error_text or output,
+                "status": "error",
+                "command": command
+            }
         return {
-            "output": "Command executed successfully",
+            "output": output,
             "status": "success",
             "command": command
         }
 
-    def _call_openai_api(self, messages: List[Dict[str, str]]) -> str:
-        """Call OpenAI API for command generation"""
-        from openai import OpenAI
+    def _get_openai_client(self):
+        """Get the shared async OpenAI client for this engine's config"""
+        if self._openai_client is None:
+            self._openai_client = _get_async_openai_client(
+                self._api_key, self.config['base_url']
+            )
+        return self._openai_client
 
-        client = OpenAI(api_key=os.getenv(self.config['env_vars'][0]))
-        response = client.chat.completions.create(
+    async def _call_openai_api(self, messages: List[Dict[str, str]]) -> str:
+        """Call OpenAI-compatible API for command generation (non-blocking)"""
+        client = self._get_openai_client()
+        response = await client.chat.completions.create(
             model=self.config['model'],
             messages=messages
         )
         return response.choices[0].message.content
 
-    def _call_spark_api(self, messages: List[Dict[str, str]]) -> str:
-        """Call Spark API for command generation"""
-        import requests
-        from requests.exceptions import RequestException
-        
-        try:
-            api_key = os.getenv(self.config['env_vars'][0])
-            headers = {
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {api_key}"
-            }
-            
-            payload = {
-                "model": self.config['model'],
-                "messages": messages,
-                "temperature": 0.7,
-                "max_tokens": 2000
-            }
-            
-            response = requests.post(
-                self.config['base_url'],
-                headers=headers,
-                json=payload,
-                timeout=30
-            )
-            response.raise_for_status()
-            
-            result = response.json()
-            return result['choices'][0]['message']['content']
-            
-        except RequestException as e:
-            ErrorHandler.log_error(e, "SPARK_API_CALL_FAILED")
-            raise ValueError(f"Spark API request failed: {str(e)}")
+    async def _call_spark_api(self, messages: List[Dict[str, str]]) -> str:
+        """Call Spark API for command generation (non-blocking, with retry)
+
+        瞬时429/5xx/超时做指数退避+抖动重试，429优先遵循
+        Retry-After头；其他4xx立即失败。
+        """
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self._api_key}"
+        }
+
+        payload = {
+            "model": self.config['model'],
+            "messages": messages,
+            "temperature": 0.7,
+            "max_tokens": 2000
+        }
+
+        max_attempts = 5
+        last_error: Optional[Exception] = None
+        for attempt in range(max_attempts):
+            try:
+                response = await _get_http_client().post(
+                    self.config['base_url'],
+                    headers=headers,
+                    json=payload
+                )
+                response.raise_for_status()
+                result = response.json()
+                return result['choices'][0]['message']['content']
+            except (httpx.TimeoutException, httpx.HTTPStatusError) as e:
+                last_error = e
+                status = (
+                    e.response.status_code
+                    if isinstance(e, httpx.HTTPStatusError) else None
+                )
+                # 非限流的4xx重试无意义
+                if status is not None and status != 429 and status < 500:
+                    break
+                if attempt == max_attempts - 1:
+                    break
+                delay = random.uniform(1, min(20, 2 ** (attempt + 1)))
+                if status == 429:
+                    retry_after = e.response.headers.get('Retry-After')
+                    if retry_after and retry_after.isdigit():
+                        delay = max(delay, float(retry_after))
+                await asyncio.sleep(delay)
+            except httpx.HTTPError as e:
+                last_error = e
+                break
+
+        ErrorHandler.log_error(last_error, "SPARK_API_CALL_FAILED")
+        raise ValueError(f"Spark API request failed: {str(last_error)}")
@@ -1,3 +1,4 @@
+import sys
 from typing import Dict, List, TypedDict, Any
 
 class ModelConfig(TypedDict):
@@ -72,4 +73,7 @@ DEFAULT_SETTINGS = {
     "max_risk_level": "medium"
 }
 
-ALLOWED_COMMANDS = ["ls", "cd", "pwd", "cat", "grep", "find", "echo"]
+# frozenset + intern：白名单查询是热路径，预驻留字符串让哈希探测走指针比较
+ALLOWED_COMMANDS = frozenset(
+    map(sys.intern, ("ls", "cd", "pwd", "cat", "grep", "find", "echo"))
+)
@@ -1,6 +1,7 @@
 # cmd_pilot/ui/components/command_history.py
+from collections import deque
 from tkinter import Frame, Listbox, Scrollbar
-from typing import List, Optional
+from typing import Deque, Iterable, Optional
 import logging
 
 class CommandHistory(Frame):
@@ -10,7 +11,9 @@ class CommandHistory(Frame):
         super().__init__(master, **kwargs)
         self.max_history = max_history
         self._init_ui()
-        self.history: List[str] = []
+        # deque自动淘汰旧记录；set提供O(1)去重查询
+        self.history: Deque[str] = deque(maxlen=max_history)
+        self._seen = set()
 
     def _init_ui(self):
         self.listbox = Listbox(self)
@@ -24,15 +27,28 @@ class CommandHistory(Frame):
 
     def add_command(self, command: str) -> None:
         """Add a command to history with validation"""
-        if not command or command in self.history:
+        if not command or command in self._seen:
             return
-            
-        self.history.insert(0, command)
+
+        if len(self.history) == self.max_history:
+            self._seen.discard(self.history[-1])
+        self.history.appendleft(command)
+        self._seen.add(command)
         self.listbox.insert(0, command)
-        
-        if len(self.history) > self.max_history:
-            self.history.pop()
-            self.listbox.delete(self.max_history)
+        self.listbox.delete(self.max_history, "end")
+
+    def add_commands(self, commands: Iterable[str]) -> None:
+        """批量加载历史记录，单次Listbox插入让Tk合并重绘"""
+        batch = [c for c in commands if c and c not in self._seen]
+        if not batch:
+            return
+        for command in batch:
+            if len(self.history) == self.max_history:
+                self._seen.discard(self.history[-1])
+            self.history.appendleft(command)
+            self._seen.add(command)
+        self.listbox.insert(0, *reversed(batch))
+        self.listbox.delete(self.max_history, "end")
 
     def get_selected(self) -> Optional[str]:
         """Get currently selected command"""
@@ -45,6 +61,7 @@ class CommandHistory(Frame):
         """Clear command history"""
         try:
             self.history.clear()
+            self._seen.clear()  # 去重缓存与历史一并失效，否则旧命令无法重加
             self.listbox.delete(0, "end")
         except Exception as e:
             logging.error(f"Error clearing history: {e}")
@@ -1,3 +1,5 @@
+import threading
+from collections import deque
 from tkinter import Frame, Text, Scrollbar
 import logging
 from typing import Optional
@@ -5,12 +7,16 @@ from typing import Optional
 
 class ConsolePanel(Frame):
     """Enhanced console panel with improved error handling and async support."""
-    
+
     def __init__(self, master, **kwargs):
         super().__init__(master, **kwargs)
         self._init_ui()
         self._setup_bindings()
         self._configure_tags()
+        # 待刷新文本队列：多次append合并为一次Tk插入/重绘
+        self._pending = deque()
+        self._flush_lock = threading.Lock()
+        self._flush_scheduled = False
 
     def _init_ui(self):
         # Main text widget with improved scrolling
@@ -34,14 +40,40 @@ class ConsolePanel(Frame):
         self.text.tag_config('warning', foreground='orange')
         self.text.tag_config('success', foreground='green')
 
-    async def append_text(self, text: str, tag: Optional[str] = None):
-        """Thread-safe text appending with optional tagging"""
-        self.text.after(0, lambda: self._safe_append(text, tag))
-        
-    def _safe_append(self, text: str, tag: Optional[str] = None):
-        """Actual text insertion (runs in main thread)"""
+    def append_text(self, text: str, tag: Optional[str] = None):
+        """Thread-safe text appending with optional tagging
+
+        入队后仅调度一次刷新，高频输出时Tk调用次数从每条一次降为
+        每批一次。固定50ms窗口而非after_idle：事件队列持续繁忙时
+        idle回调可能逐条触发，固定窗口保证每窗口至多一次批量插入。
+        """
+        self._pending.append((text, tag))
+        with self._flush_lock:
+            if not self._flush_scheduled:
+                self._flush_scheduled = True
+                self.text.after(50, self._flush)
+
+    def _flush(self):
+        """Drain pending chunks in one pass (runs in main thread)"""
+        with self._flush_lock:
+            self._flush_scheduled = False
+        if not self._pending:
+            return
+
         self.text.configure(state='normal')
-        self.text.insert('end', text + '\n', tag)
+        # 相邻同tag的文本合并成单次insert
+        group, group_tag = [], None
+        while self._pending:
+            text, tag = self._pending.popleft()
+            if group and tag != group_tag:
+                group.append('')  # join自带收尾换行，免去+拼接再分配一次
+                self.text.insert('end', '\n'.join(group), group_tag)
+                group = []
+            group_tag = tag
+            group.append(text)
+        if group:
+            group.append('')
+            self.text.insert('end', '\n'.join(group), group_tag)
         self.text.configure(state='disabled')
         self.text.see('end')
 
@@ -0,0 +1,35 @@
+# cmd_pilot/ui/components/top_bar.py
+from tkinter import Frame, StringVar
+from tkinter import ttk
+
+from cmd_pilot.config import MODEL_CONFIGS
+
+
+class TopBar(Frame):
+    """顶部控制栏：模型选择与上下文操作"""
+
+    # 类定义时固化一次，实例化不再重建模型列表
+    _MODEL_KEYS = tuple(MODEL_CONFIGS.keys())
+
+    def __init__(self, master, **kwargs):
+        super().__init__(master, **kwargs)
+        self._init_ui()
+
+    def _init_ui(self):
+        ttk.Label(self, text="AI模型:").pack(side="left", padx=5)
+        self.model_var = StringVar()
+        self.model_combobox = ttk.Combobox(
+            self,
+            textvariable=self.model_var,
+            values=self._MODEL_KEYS,
+            state="readonly"
+        )
+        self.model_combobox.pack(side="left", padx=5)
+        self.model_combobox.current(0)
+
+        self.clear_ctx_btn = ttk.Button(self, text="清除上下文")
+        self.clear_ctx_btn.pack(side="right", padx=5)
+
+    def get_selected_model(self) -> str:
+        """返回当前选中的模型ID"""
+        return self.model_var.get()
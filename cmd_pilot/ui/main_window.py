@@ -1,4 +1,4 @@
-from cmd_pilot.ui.components.console import ConsolePanel
+from cmd_pilot.ui.components.console_panel import ConsolePanel
 from cmd_pilot.ui.components.top_bar import TopBar
 from cmd_pilot.ui.components.command_history import CommandHistory
 from cmd_pilot.utils.security import CommandValidator
@@ -64,11 +64,12 @@ class ModernUI(tk.Tk):
 
     def validate_command(self, command):
         """Use centralized command validation with risk assessment"""
-        if not self.command_validator.is_safe(command):
-            risk = self.command_validator.assess_risk(command)
+        from cmd_pilot.utils.security import analyze
+        analysis = analyze(command)
+        if not analysis.safe:
             self.show_error(
-                f"Command rejected (Risk: {risk['level']})\n"
-                f"Reasons: {', '.join(risk['reasons'])}"
+                f"Command rejected (Risk: {analysis.risk_level})\n"
+                f"Reasons: {', '.join(analysis.reasons)}"
             )
             return False
         return True
@@ -1,4 +1,5 @@
 import asyncio
+import threading
 from concurrent.futures import ThreadPoolExecutor
 from functools import partial
 
@@ -6,6 +7,15 @@ class AsyncExecutor:
     def __init__(self):
         self.loop = asyncio.new_event_loop()
         self.executor = ThreadPoolExecutor(max_workers=4)
+        # 后台线程常驻运行事件循环，供同步调用方提交协程
+        self._thread = threading.Thread(
+            target=self.loop.run_forever, daemon=True
+        )
+        self._thread.start()
+
+    def run_coroutine(self, coro):
+        """Submit a coroutine to the background loop, returns a Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
 
     async def run_blocking(self, func, *args):
         """Execute blocking functions asynchronously"""
@@ -27,9 +37,26 @@ class AsyncExecutor:
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.executor.shutdown(wait=True)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5)
         self.loop.close()
 
     @staticmethod
     async def gather(*coroutines):
         """Wrapper for asyncio.gather"""
         return await asyncio.gather(*coroutines)
+
+
+# 模块级共享执行器，按需创建，避免每个调用方各起一个事件循环
+_shared_executor = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_executor() -> AsyncExecutor:
+    """Get the process-wide shared AsyncExecutor (lazily created)"""
+    global _shared_executor
+    if _shared_executor is None:
+        with _shared_lock:
+            if _shared_executor is None:
+                _shared_executor = AsyncExecutor()
+    return _shared_executor
@@ -0,0 +1,101 @@
+import asyncio
+import re
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+# 疑似瞬时故障（限流/服务端错误/超时/连接问题），值得退避重试；
+# 引擎把异常折叠成error字符串返回，只能按文本判别
+_TRANSIENT_ERROR_RE = re.compile(
+    r'429|rate.?limit|5\d\d|timeout|timed?\s?out|connect', re.IGNORECASE
+)
+
+
+class BatchCommandGenerator:
+    """批量命令生成器，带速率限制和并发控制
+
+    并发驱动多个 async_generate_command 调用，同时遵守
+    RPM/TPM 限制，失败时指数退避重试。
+    """
+
+    def __init__(
+        self,
+        engine,
+        num_concurrent: int = 8,
+        max_requests_per_minute: int = 60,
+        max_tokens_per_minute: int = 90000,
+        max_attempts: int = 3,
+        cache_size: int = 256,
+    ):
+        self.engine = engine
+        self.num_concurrent = num_concurrent
+        self.max_requests_per_minute = max_requests_per_minute
+        self.max_tokens_per_minute = max_tokens_per_minute
+        self.max_attempts = max_attempts
+        self._semaphore = asyncio.Semaphore(num_concurrent)
+        # 令牌桶状态
+        self._request_capacity = float(max_requests_per_minute)
+        self._token_capacity = float(max_tokens_per_minute)
+        self._last_refill = time.monotonic()
+        # LRU缓存，避免重复查询重复计费
+        self._cache: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+        self._cache_size = cache_size
+
+    def _refill_buckets(self) -> None:
+        """按流逝时间补充请求/令牌桶"""
+        now = time.monotonic()
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        self._request_capacity = min(
+            float(self.max_requests_per_minute),
+            self._request_capacity + self.max_requests_per_minute * elapsed / 60.0,
+        )
+        self._token_capacity = min(
+            float(self.max_tokens_per_minute),
+            self._token_capacity + self.max_tokens_per_minute * elapsed / 60.0,
+        )
+
+    async def _acquire_budget(self, estimated_tokens: int) -> None:
+        """等待直到桶内有足够的请求和令牌额度"""
+        while True:
+            self._refill_buckets()
+            if self._request_capacity >= 1 and self._token_capacity >= estimated_tokens:
+                self._request_capacity -= 1
+                self._token_capacity -= estimated_tokens
+                return
+            await asyncio.sleep(0.1)
+
+    async def _generate_one(self, query: str) -> Dict[str, Any]:
+        cache_key = (self.engine.model_id, query)
+        if cache_key in self._cache:
+            self._cache.move_to_end(cache_key)
+            return self._cache[cache_key]
+
+        # 粗略估算：每4字符约1 token，外加提示词开销
+        estimated_tokens = len(query) // 4 + 200
+
+        last_error: Optional[str] = None
+        result: Dict[str, Any] = {}
+        for attempt in range(self.max_attempts):
+            async with self._semaphore:
+                await self._acquire_budget(estimated_tokens)
+                result = await self.engine.async_generate_command(query)
+            # 引擎内部已捕获所有异常并折叠为error字段，不会抛出
+            error = result.get("error")
+            if not error:
+                self._cache[cache_key] = result
+                if len(self._cache) > self._cache_size:
+                    self._cache.popitem(last=False)
+                return result
+            last_error = error
+            if not _TRANSIENT_ERROR_RE.search(error):
+                return result  # 非瞬时错误（4xx等），重试无意义
+            await asyncio.sleep(2 ** attempt)
+
+        logging.error(f"批量生成失败（重试{self.max_attempts}次）: {last_error}")
+        return result
+
+    async def generate_all(self, queries: List[str]) -> List[Dict[str, Any]]:
+        """并发生成所有查询的命令，保持输入顺序"""
+        return await asyncio.gather(*[self._generate_one(q) for q in queries])
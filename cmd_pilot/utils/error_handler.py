@@ -1,18 +1,63 @@
+import requests
+import json
+import subprocess
 import logging
-from typing import Any
+
+from .security import SecurityError
+
 
 class ErrorHandler:
-    """错误处理工具类"""
-    
-    @staticmethod
-    def log_error(error: Exception, context: str = None) -> None:
-        """记录错误日志
-        
-        Args:
-            error: 异常对象
-            context: 错误上下文信息
+    """错误处理工具类（唯一权威实现，合并自 cmd_pilot/error_handler.py）"""
+
+    @classmethod
+    def handle_api_error(cls, exc: Exception) -> str:
+        """Enhanced error handler for API-related exceptions"""
+        error_map = {
+            requests.Timeout: "API请求超时，请检查网络连接",
+            requests.HTTPError: lambda e: f"HTTP错误: {e.response.status_code}",
+            json.JSONDecodeError: "无效的API响应格式"
+        }
+        handler = error_map.get(type(exc), str(exc))
+        return handler(exc) if callable(handler) else handler
+
+    @classmethod
+    def handle_command_error(cls, exc: Exception) -> str:
+        """Enhanced handler for command execution errors"""
+        error_map = {
+            subprocess.TimeoutExpired: "命令执行超时",
+            subprocess.CalledProcessError: lambda e: f"命令执行失败 (返回码: {e.returncode})",
+            SecurityError: lambda e: f"安全限制: {e.message} (风险等级: {e.risk_level})",
+            FileNotFoundError: "命令不存在或路径错误"
+        }
+        if type(exc) in error_map:
+            handler = error_map[type(exc)]
+            return handler(exc) if callable(handler) else handler
+        return str(exc)
+
+    @classmethod
+    def log_error(cls, exc: Exception, context: str = "") -> None:
+        """Enhanced error logging with security context
+
+        %s延迟格式化：日志被过滤时不产生字符串开销
         """
-        error_msg = f"[{context}] {str(error)}" if context else str(error)
-        logging.error(error_msg)
-        
-        # 可以在这里添加其他错误处理逻辑，如发送错误报告等
+        if isinstance(exc, SecurityError):
+            logging.error(
+                "[SECURITY][%s] %s - Command: %s, Risk: %s",
+                context, exc.message, exc.command, exc.risk_level,
+                exc_info=True
+            )
+        else:
+            logging.error("[%s] Error: %s", context, exc, exc_info=True)
+
+    @staticmethod
+    def get_user_friendly_message(exc: Exception) -> str:
+        """More comprehensive user-friendly messages"""
+        if isinstance(exc, SecurityError):
+            return f"安全限制: 检测到危险操作 ({exc.risk_level}风险)"
+        elif isinstance(exc, (requests.Timeout, requests.ConnectionError)):
+            return "网络连接出现问题，请检查后重试"
+        elif isinstance(exc, json.JSONDecodeError):
+            return "服务器返回了无效的响应"
+        elif isinstance(exc, subprocess.CalledProcessError):
+            return f"命令执行失败 (错误码: {exc.returncode})"
+        return "发生未知错误，请查看日志获取详细信息"
@@ -0,0 +1,64 @@
+"""批量风险评分内核
+
+将命令token映射为整数ID后用紧凑循环求和评分，供历史记录
+批量审计使用。安装了 numba+numpy 时内核会被JIT编译并在导入时
+预热；否则退回纯Python实现，接口不变。
+"""
+
+from typing import Iterable, List
+
+# token -> (id, score)，与 CommandValidator._OP_SCORES 保持一致
+_OP_TABLE = {
+    'rm': (0, 30),
+    'del': (1, 30),
+    'kill': (2, 25),
+    'chmod': (3, 20),
+    'mv': (4, 15),
+    '>': (5, 10),
+    'wget': (6, 40),
+    'curl': (7, 40),
+    'nc': (8, 50),
+    'ssh': (9, 30),
+    'scp': (10, 30),
+    'telnet': (11, 50),
+}
+_SCORE_LIST = [score for _, score in sorted(_OP_TABLE.values())]
+
+try:
+    import numpy as np
+    from numba import njit, int32
+
+    _SCORES = np.array(_SCORE_LIST, dtype=np.int32)
+
+    @njit(cache=True)
+    def _score_tokens_jit(token_ids, scores):
+        total = 0
+        for i in range(token_ids.shape[0]):
+            total += scores[token_ids[i]]
+        return total
+
+    # 导入时预热JIT，首次用户调用不承担编译开销
+    _score_tokens_jit(np.empty(0, dtype=np.int32), _SCORES)
+
+    def score_tokens(token_ids: List[int]) -> int:
+        """对已编码的token ID数组求风险总分"""
+        return int(_score_tokens_jit(
+            np.asarray(token_ids, dtype=np.int32), _SCORES
+        ))
+
+except ImportError:
+    def score_tokens(token_ids: List[int]) -> int:
+        """纯Python回退：对已编码的token ID数组求风险总分"""
+        scores = _SCORE_LIST
+        return sum(scores[i] for i in token_ids)
+
+
+def encode_tokens(tokens: Iterable[str]) -> List[int]:
+    """将命令token编码为内核可用的整数ID，忽略未知token"""
+    table = _OP_TABLE
+    return [table[t][0] for t in tokens if t in table]
+
+
+def score_commands(token_lists: Iterable[List[str]]) -> List[int]:
+    """批量评分：对每条已分词命令返回其风险总分"""
+    return [score_tokens(encode_tokens(tokens)) for tokens in token_lists]
@@ -0,0 +1,115 @@
+"""分级风险模式扫描（进程池安全）
+
+供 main.py 的 analyze_risk / analyze_risk_batch 使用。扫描函数必须
+放在可导入的模块里：spawn启动方式下（Windows默认）进程池worker要
+重新导入函数所在模块，定义在入口脚本里会直接BrokenProcessPool。
+"""
+
+import re
+from functools import lru_cache
+from typing import Any, Dict, Tuple
+
+try:
+    import ahocorasick  # pyahocorasick：风险关键词的单遍线性扫描
+except ImportError:
+    ahocorasick = None
+
+# 各风险模式的字面锚点关键词 -> 等级。自动机一遍扫完所有关键词，
+# 只对命中的等级做正则确认；绝大多数安全命令零正则开销
+_RISK_LITERALS = {
+    'sudo': 'critical', 'pkexec': 'critical', 'doas': 'critical',
+    'start-process': 'critical',
+    'rm': 'high', 'format': 'high', 'dd': 'high', 'shred': 'high',
+    'chmod': 'high',
+    'curl': 'medium', 'wget': 'medium', 'ssh': 'medium', 'mount': 'medium',
+}
+
+_RISK_AC = None
+if ahocorasick is not None:
+    _RISK_AC = ahocorasick.Automaton()
+    for _lit, _level in _RISK_LITERALS.items():
+        _RISK_AC.add_word(_lit, _level)
+    _RISK_AC.make_automaton()
+    del _lit, _level
+
+# 模块加载时预编译，避免每条命令都走re.search的编译/缓存查找；
+# 同时保留原始串用于结果上报
+PRIVILEGE_PATTERNS = {
+    'privilege_escalation': [
+        (re.compile(p, re.IGNORECASE), p) for p in (
+            r'sudo\s+\w+',
+            r'pkexec\s+\w+',
+            r'doas\s+\w+',
+            r'Start-Process\s+.*-Verb\s+RunAs'
+        )
+    ],
+    'data_destruction': [
+        (re.compile(p, re.IGNORECASE), p) for p in (
+            r'rm\s+-(rf|fr)',
+            r'format\s+\w+:',
+            r'dd\s+if=.*of=',
+            r'shred\s+-n',
+            r'chmod\s+0{3,4}\s'
+        )
+    ],
+    'network_operations': [
+        (re.compile(p, re.IGNORECASE), p) for p in (
+            r'curl\s+-F\s+@',
+            r'wget\s+--post-file',
+            r'ssh\s+-o\s+StrictHostKeyChecking=no',
+            r'mount\s+.*-o\s+rw'
+        )
+    ]
+}
+
+# 每个等级融合为单个交替正则做预筛：未命中的等级一次扫描出局；
+# 命中后仍逐条确认源模式（finditer不重叠，直接取组会漏报）
+_FUSED_PATTERNS = {
+    level: (
+        re.compile(
+            '|'.join(f'(?:{src})' for _, src in patterns),
+            re.IGNORECASE
+        ),
+        patterns
+    )
+    for level, patterns in [
+        ("critical", PRIVILEGE_PATTERNS['privilege_escalation']),
+        ("high", PRIVILEGE_PATTERNS['data_destruction']),
+        ("medium", PRIVILEGE_PATTERNS['network_operations'])
+    ]
+}
+
+
+@lru_cache(maxsize=256)
+def analyze_risk_cached(command: str) -> Tuple[Tuple[str, Tuple[str, ...]], ...]:
+    """纯函数风险扫描，返回不可变结构以便lru_cache共享"""
+    results = []
+    fused_items = _FUSED_PATTERNS.items()
+    if _RISK_AC is not None:
+        # 先用Aho-Corasick筛出命中关键词的等级，再逐级正则确认
+        hit_levels = {level for _, level in _RISK_AC.iter(command.lower())}
+        if not hit_levels:
+            return ()
+        fused_items = [
+            (level, fused) for level, fused in fused_items
+            if level in hit_levels
+        ]
+    for level, (fused, patterns) in fused_items:
+        # 融合正则只当预筛用：重叠命中时finditer会吞掉后续模式的
+        # 匹配区间，patterns/count必须逐条确认（与assess_risk_levels同构）
+        if fused.search(command) is None:
+            continue
+        matched = tuple(
+            src for rx, src in patterns if rx.search(command)
+        )
+        if matched:
+            results.append((level, matched))
+    return tuple(results)
+
+
+def risk_tuples_to_dict(items) -> Dict[str, Dict[str, Any]]:
+    """把缓存的不可变结果还原成原有的dict形态"""
+    return {
+        level: {"patterns": list(patterns), "count": len(patterns)}
+        for level, patterns in items
+    }
@@ -1,23 +1,80 @@
+"""命令安全验证（唯一权威实现）
+
+合并了原 cmd_pilot/security.py 与本模块中重复且行为漂移的
+CommandValidator / SecurityError 定义。
+"""
+
+from collections import namedtuple
+from functools import lru_cache
+import shlex
 import re
-from typing import Dict, Any
+from typing import Set, Dict, Any
+import logging
+import os
+import sys
+import traceback
+
+from cmd_pilot.config import ALLOWED_COMMANDS
+
+# 模块级白名单/危险操作集合：驻留字符串 + frozenset，哈希探测走指针比较
+_DEFAULT_ALLOWED = frozenset(ALLOWED_COMMANDS)
+_DANGEROUS_FS_OPS = frozenset(
+    map(sys.intern, ("rm", "del", "mv", "chmod", "chown"))
+)
+
 
 class SecurityError(Exception):
     """安全验证异常"""
     def __init__(self, message: str, command: str = None, risk_level: str = None):
         super().__init__(message)
         self.command = command
-        self.risk_level = risk_level  # 新增风险等级属性
+        self.risk_level = risk_level
+        self.message = f"Security violation: {message}"
+        if command:
+            self.message += f" in command: {command}"
+
 
 class CommandValidator:
-    """命令验证器"""
-    
+    """Centralized command validation with comprehensive security checks"""
+
+    BLACKLISTED_PATTERNS = [
+        # Combined command control patterns
+        r'[&|;]\s*[&|;]',  # command chaining/separators
+        r'[`$]\s*\(.*\)|\$\{.*\}',  # command substitution
+        r'\|\s*[a-z]',  # piping to commands
+
+        # Dangerous operations
+        r'(rm|del)\s+-([rf]|[sq])',  # recursive/file deletion
+        r'chmod\s+[0-7]{3,4}',  # permission changes
+        r'(wget|curl)\s+https?://',  # remote downloads
+        r'(nc|ncat|netcat)\s+-[a-z]',  # netcat usage
+        r'(python|perl|ruby|bash)\s+-[c]',  # arbitrary code execution
+        r'base64\s+-d',  # base64 encoded commands
+        r'(\.\/|\.\.\/|\/etc\/|\/tmp\/)[^\s]*',  # sensitive file access
+        r'(ssh|scp|sftp)\s+[^\s]+@[^\s]+',  # remote connections
+        r'\bformat\s+\w+:',  # disk formatting
+        r'\bdd\s+if=.*of=',  # raw disk writes
+        r'\bshred\s+-n',  # secure deletion
+        r'\b(sudo|pkexec|doas)\s+\w+',  # privilege escalation
+        r'\bStart-Process\s+.*-Verb\s+RunAs',  # Windows elevation
+        r'\bssh\s+-o\s+StrictHostKeyChecking=no',
+        r'\bmount\s+.*-o\s+rw'
+    ]
+
+    # 类加载时合并为单个交替正则，一次扫描替代N次引擎调用
+    _BLACKLIST_RE = re.compile(
+        "|".join(f"(?:{p})" for p in BLACKLISTED_PATTERNS),
+        re.IGNORECASE
+    )
+
+    # 分级风险模式（供 assess_risk_levels 的桶式评估使用）
     PRIVILEGE_PATTERNS = {
         'privilege_escalation': [
             r'\bsudo\s+\w+',
             r'\bpkexec\s+\w+',
             r'\bdoas\s+\w+',
             r'\bStart-Process\s+.*-Verb\s+RunAs',
-            r'[;|&amp;]\s*[;|&amp;]'  # 严格匹配命令连接符
+            r'[;|&]\s*[;|&]'  # 严格匹配命令连接符
         ],
         'data_destruction': [
             r'\b(rm|del)\s+-[rf]',  # 严格匹配rm -r/f
@@ -33,57 +90,378 @@ class CommandValidator:
         ]
     }
 
+    # 类加载时按风险等级合并为单个交替正则，避免逐条调用正则引擎
+    _LEVEL_RES = {
+        level: re.compile(
+            "|".join(f"(?:{p})" for p in patterns),
+            re.IGNORECASE
+        )
+        for level, patterns in [
+            ("critical", PRIVILEGE_PATTERNS['privilege_escalation']),
+            ("high", PRIVILEGE_PATTERNS['data_destruction']),
+            ("medium", PRIVILEGE_PATTERNS['network_operations'])
+        ]
+    }
+    _COMPILED_PATTERNS = {
+        level: [re.compile(p, re.IGNORECASE) for p in patterns]
+        for level, patterns in [
+            ("critical", PRIVILEGE_PATTERNS['privilege_escalation']),
+            ("high", PRIVILEGE_PATTERNS['data_destruction']),
+            ("medium", PRIVILEGE_PATTERNS['network_operations'])
+        ]
+    }
+
+    # Merged operation scores: token -> (score, category label)
+    # Token-level lookup avoids substring false positives ('nc' in 'sync')
+    _OP_SCORES = {
+        'rm': (30, 'Dangerous operation'),
+        'del': (30, 'Dangerous operation'),
+        'kill': (25, 'Dangerous operation'),
+        'chmod': (20, 'Dangerous operation'),
+        'mv': (15, 'Dangerous operation'),
+        '>': (10, 'Dangerous operation'),
+        'wget': (40, 'Network operation'),
+        'curl': (40, 'Network operation'),
+        'nc': (50, 'Network operation'),
+        'ssh': (30, 'Network operation'),
+        'scp': (30, 'Network operation'),
+        'telnet': (50, 'Network operation'),
+    }
+
+    def __init__(self, allowed_commands: Set[str] = None):
+        # frozenset: 可哈希，作为模块级缓存键的一部分在实例间共享
+        if allowed_commands is None:
+            self._allowed_commands = _DEFAULT_ALLOWED
+        else:
+            self._allowed_commands = frozenset(allowed_commands)
+
     def sanitize_command(self, command: str) -> str:
         """清理命令中的潜在危险内容"""
         if not command:
             return ""
-            
-        # 移除注释
-        cleaned = re.sub(r'#.*$', '', command)
+
+        # 移除注释（partition比正则引擎快且语义相同）
+        cleaned = command.partition('#')[0]
         # 移除多余空格
         cleaned = ' '.join(cleaned.split())
         return cleaned
 
-    @lru_cache(maxsize=512)
     def is_safe(self, command: str) -> bool:
-        """检查命令是否安全"""
-        command = command.strip()
-        if not command:
-            return False
-        
-        # 检查命令注入
-        if re.search(r'[;&|]', command):
-            return False
-        
-        try:
-            parsed = shlex.split(command)
-            if not parsed:
-                return False
-            return (parsed[0] in self._allowed_commands 
-                    and not any(p.search(command) for p in self._compiled_patterns))
-        except ValueError:
-            return False
+        """Comprehensive command safety check with detailed validation"""
+        return _is_safe_cached(command.strip(), self._allowed_commands)
+
+    @staticmethod
+    def _check_filesystem_access(parsed_command: list) -> bool:
+        """Check for dangerous filesystem operations"""
+        return _DANGEROUS_FS_OPS.isdisjoint(parsed_command)
+
+    def assess_risk(self, command: str) -> Dict[str, Any]:
+        """Enhanced risk assessment with detailed scoring"""
+        risk = {'level': 'low', 'score': 0, 'reasons': [], 'suggestions': []}
 
-    def _check_filesystem_access(self, parsed_command: list) -> bool:
-        """检查危险文件操作"""
-        dangerous_commands = {'rm', 'del', 'mv', 'chmod', 'chown'}
-        return parsed_command[0] not in dangerous_commands
+        # Single tokenizer pass shared by all rules below
+        tokens = _fast_split(command)
+        if tokens is None:
+            try:
+                tokens = shlex.split(command)
+            except ValueError:
+                tokens = command.split()
+        n_tokens = len(tokens)
 
-    def assess_risk(self, command: str) -> Dict[str, Dict[str, Any]]:
-        """评估命令风险级别"""
+        # Length risk
+        if len(command) > 100:
+            risk['score'] += 20
+            risk['reasons'].append('Long command (>100 chars)')
+
+        # Complexity risk
+        if n_tokens > 3:
+            risk['score'] += 10 * (n_tokens - 3)
+            risk['reasons'].append(f'Complex command ({n_tokens} parts)')
+
+        # Dangerous/network operations via O(tokens) hash lookups
+        for token in tokens:
+            score, kind = self._OP_SCORES.get(token, (0, None))
+            if kind:
+                risk['score'] += score
+                risk['reasons'].append(f'{kind}: {token}')
+                risk['suggestions'].append(f'Review {token} usage carefully')
+
+        # Determine final level
+        if risk['score'] >= 50:
+            risk['level'] = 'critical'
+        elif risk['score'] >= 30:
+            risk['level'] = 'high'
+        elif risk['score'] >= 15:
+            risk['level'] = 'medium'
+
+        return risk
+
+    def assess_risk_levels(self, command: str) -> Dict[str, Dict[str, Any]]:
+        """按风险等级桶评估命令（critical/high/medium -> 命中模式）"""
         results = {}
-        for level, patterns in [
-            ("critical", self.PRIVILEGE_PATTERNS['privilege_escalation']),
-            ("high", self.PRIVILEGE_PATTERNS['data_destruction']),
-            ("medium", self.PRIVILEGE_PATTERNS['network_operations'])
-        ]:
-            matched = []
-            for pattern in patterns:
-                if re.search(pattern, command, re.IGNORECASE):
-                    matched.append(pattern)
+        level_items = self._LEVEL_RES.items()
+        if _LEVEL_AC is not None:
+            # 自动机一遍扫出命中关键词的等级；全未命中即零正则开销。
+            # shell命令绝大多数本就全小写，islower先验免去副本分配
+            lowered = command if command.islower() else command.lower()
+            hit_levels = {lvl for _, lvl in _LEVEL_AC.iter(lowered)}
+            # 连接符模式无字面锚点，单独补critical候选
+            if not _CHAIN_CHARS.isdisjoint(command):
+                hit_levels.add('critical')
+            if not hit_levels:
+                return results
+            level_items = [
+                (lvl, rx) for lvl, rx in level_items if lvl in hit_levels
+            ]
+        else:
+            # 回退路径同样先做廉价字面预筛，无锚点命中的等级不进正则；
+            # critical的连接符模式无字面锚点，按连接符字符单独放行
+            level_items = [
+                (lvl, rx) for lvl, rx in level_items
+                if _LEVEL_ANCHOR_RES[lvl].search(command) is not None
+                or (lvl == 'critical'
+                    and not _CHAIN_CHARS.isdisjoint(command))
+            ]
+        for level, level_re in level_items:
+            # 合并正则先做单次预筛，命中后才逐条定位具体模式
+            if level_re.search(command) is None:
+                continue
+            matched = [
+                p.pattern for p in self._COMPILED_PATTERNS[level]
+                if p.search(command)
+            ]
             if matched:
                 results[level] = {
                     "patterns": matched,
                     "count": len(matched)
                 }
         return results
+
+    def score_history(self, commands: list) -> list:
+        """批量评分历史命令（仅操作分值，供审计/回放用）"""
+        from cmd_pilot.utils.risk_kernel import score_commands
+        token_lists = []
+        for command in commands:
+            tokens = _fast_split(command)
+            if tokens is None:
+                try:
+                    tokens = shlex.split(command)
+                except ValueError:
+                    tokens = command.split()
+            token_lists.append(tokens)
+        return score_commands(token_lists)
+
+
+# 可选加速：Hyperscan多模式DFA，一次扫描同时匹配全部黑名单模式。
+# 未安装（或模式不被支持）时回退到合并的re交替正则。
+_HS_DB = None
+try:
+    import hyperscan
+
+    _hs_patterns = [p.encode() for p in CommandValidator.BLACKLISTED_PATTERNS]
+    _hs_db = hyperscan.Database()
+    _hs_db.compile(
+        expressions=_hs_patterns,
+        ids=list(range(len(_hs_patterns))),
+        flags=[hyperscan.HS_FLAG_CASELESS] * len(_hs_patterns)
+    )
+    _HS_DB = _hs_db
+except Exception:
+    _HS_DB = None
+
+
+# 可选加速：Aho-Corasick自动机单遍扫出各风险等级的字面锚点关键词，
+# assess_risk_levels据此跳过未命中等级的正则确认；未安装时为None
+_LEVEL_LITERALS = {
+    'critical': ('sudo', 'pkexec', 'doas', 'start-process'),
+    'high': ('rm', 'del', 'format', 'dd', 'shred', 'chmod'),
+    'medium': ('curl', 'wget', 'ssh', 'mount'),
+}
+# critical桶的命令连接符模式[;|&]\s*[;|&]没有字面锚点，预筛不能
+# 只看关键词——含任一连接符即视为critical候选，交给正则确认
+_CHAIN_CHARS = frozenset(';&|')
+# 无自动机时的等级锚点预筛：纯字面交替正则走C层memmem类快速路径，
+# 多行脚本整体一遍扫完，未命中等级直接跳过完整模式确认
+_LEVEL_ANCHOR_RES = {
+    _level: re.compile(
+        '|'.join(map(re.escape, _lits)), re.IGNORECASE
+    )
+    for _level, _lits in _LEVEL_LITERALS.items()
+}
+_LEVEL_AC = None
+try:
+    import ahocorasick
+
+    _level_ac = ahocorasick.Automaton()
+    for _level, _lits in _LEVEL_LITERALS.items():
+        for _lit in _lits:
+            _level_ac.add_word(_lit, _level)
+    _level_ac.make_automaton()
+    _LEVEL_AC = _level_ac
+except ImportError:
+    _LEVEL_AC = None
+
+
+def _blacklist_hit(command: str) -> bool:
+    """单次扫描判断命令是否命中任一黑名单模式"""
+    if _HS_DB is not None:
+        matches = []
+        _HS_DB.scan(
+            command.encode(),
+            match_event_handler=lambda pid, start, end, flags, ctx: matches.append(pid)
+        )
+        return bool(matches)
+    return CommandValidator._BLACKLIST_RE.search(command) is not None
+
+
+# 含引号/转义的命令才需要完整的shlex状态机
+_QUOTE_CHARS = frozenset('"\'\\')
+
+
+def _fast_split(cmd: str):
+    """快速分词：无引号/转义时直接str.split，否则返回None回退shlex"""
+    if _QUOTE_CHARS.isdisjoint(cmd):
+        return cmd.split()
+    return None
+
+
+# 正则前置的廉价预筛：短命令且不含这些字符/子串时可跳过黑名单扫描
+_DANGEROUS_CHARS = frozenset(";&|`$(){}")
+_SUSPICIOUS_SUBSTR = ('../', '/./', '${', '$(', '/etc/', '/tmp/', './')
+# k个子串的k趟扫描合并为一趟C级交替匹配
+_SUSPICIOUS_RE = re.compile('|'.join(map(re.escape, _SUSPICIOUS_SUBSTR)))
+# 黑名单各模式的锚点关键字；词边界匹配后快速路径与全量扫描结论一致。
+# IGNORECASE直接扫原串，省去逐token构造小写副本的分配
+_RISKY_TOKENS = (
+    'rm', 'del', 'chmod', 'chown', 'mv', 'wget', 'curl',
+    'nc', 'ncat', 'netcat', 'python', 'perl', 'ruby', 'bash',
+    'base64', 'ssh', 'scp', 'sftp', 'sudo', 'pkexec', 'doas',
+    'dd', 'shred', 'format', 'mount', 'start-process'
+)
+_RISKY_TOKEN_RE = re.compile(
+    r'\b(?:' + '|'.join(map(re.escape, _RISKY_TOKENS)) + r')\b',
+    re.IGNORECASE
+)
+
+
+@lru_cache(maxsize=4096)
+def _is_safe_cached(command: str, allowed: frozenset) -> bool:
+    """模块级安全检查缓存，不含self，所有验证器实例共享"""
+    if not command:
+        return False
+
+    # Add check for relative paths
+    if '../' in command or '/./' in command:
+        return False
+
+    # Add check for environment variables
+    if '$(' in command or '${' in command:
+        return False
+
+    try:
+        parsed = _fast_split(command)
+        if parsed is None:
+            parsed = shlex.split(command)
+        if not parsed:
+            return False
+        if parsed[0] not in allowed:
+            return False
+        # 快速接受：短、无危险字符/子串、无风险token的命令免正则扫描
+        if (len(command) < 64
+                and _DANGEROUS_CHARS.isdisjoint(command)
+                and _SUSPICIOUS_RE.search(command) is None
+                and _RISKY_TOKEN_RE.search(command) is None):
+            return CommandValidator._check_filesystem_access(parsed)
+        return (not _blacklist_hit(command) and
+                CommandValidator._check_filesystem_access(parsed))
+    except ValueError:
+        return False
+
+
+# 模块级单例，避免每次sanitize都重建验证器；默认白名单取自配置
+_default_validator = CommandValidator()
+
+# 单次分析结果：UI校验、引擎执行、历史记录共用，避免重复分词/扫描
+CommandAnalysis = namedtuple(
+    'CommandAnalysis', 'safe tokens risk_level risk_score reasons'
+)
+
+# 等级序，供token评分与桶式模式评估取较高者
+_LEVEL_RANK = {'low': 0, 'medium': 1, 'high': 2, 'critical': 3}
+
+
+@lru_cache(maxsize=2048)
+def analyze(command: str) -> CommandAnalysis:
+    """对命令做一次完整分析（分词+安全检查+风险评估）并缓存"""
+    command = command.strip()
+    tokens = _fast_split(command)
+    if tokens is None:
+        try:
+            tokens = shlex.split(command)
+        except ValueError:
+            tokens = command.split()
+    safe = _is_safe_cached(command, _DEFAULT_ALLOWED)
+    risk = _default_validator.assess_risk(command)
+    # token评分表不含sudo/pkexec等提权词，桶式模式评估补上这一类；
+    # 最终等级取两者较高，提权命令不会再被判为low放行
+    level = risk['level']
+    reasons = list(risk['reasons'])
+    for bucket_level, hit in _default_validator.assess_risk_levels(command).items():
+        if _LEVEL_RANK[bucket_level] > _LEVEL_RANK[level]:
+            level = bucket_level
+        reasons.append(
+            f"Matched {bucket_level} pattern(s): {', '.join(hit['patterns'])}"
+        )
+    return CommandAnalysis(
+        safe=safe,
+        tokens=tuple(tokens),
+        risk_level=level,
+        risk_score=risk['score'],
+        reasons=tuple(reasons)
+    )
+
+
+def sanitize_command(command: str) -> str:
+    """Centralized command sanitization with strict validation"""
+    command = command.strip()
+    validator = _default_validator
+    if not validator.is_safe(command):
+        risk = validator.assess_risk(command)
+        raise SecurityError(
+            f"Command rejected (risk: {risk['level']})",
+            command,
+            risk_level=risk['level']
+        )
+    return ' '.join(shlex.split(command))
+
+
+# 模块级logger，避免每次事件都走getLogger查找
+_sec_logger = logging.getLogger('security')
+
+
+def log_security_event(event_type: str, details: str):
+    """Centralized security logging with stack trace"""
+    # isEnabledFor先行：被过滤的日志不做任何字符串/栈格式化工作
+    if _sec_logger.isEnabledFor(logging.WARNING):
+        _sec_logger.warning(
+            "Security event [%s]: %s", event_type, details,
+            stack_info=True
+        )
+
+
+def validate_environment() -> bool:
+    """Check for secure execution environment"""
+    try:
+        # Check for restricted PATH
+        path = os.environ.get('PATH', '')
+        if '/usr/local/sbin' in path or '/usr/sbin' in path:
+            return False
+
+        # Check for safe umask
+        if os.umask(0) != 0o077:
+            return False
+
+        return os.geteuid() != 0  # Don't run as root
+    except Exception as e:
+        log_security_event('ENV_CHECK_FAILED', str(e))
+        return False
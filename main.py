@@ -1,32 +1,91 @@
 import os
 import re
-import platform
 import subprocess
 import threading
+import queue
+import types
+import weakref
 import asyncio
-import requests
+import httpx
 import tempfile
 import json
 import shlex
+import sys
+import logging
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
+from collections import OrderedDict, deque
 from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Any, Dict, List, Optional, Tuple, TypedDict, Union
 from functools import partial, lru_cache
-import argparse
-import logging
-from dotenv import load_dotenv
-import sys
-import os
-# 添加项目根目录到Python路径
+
+try:
+    import orjson  # SIMD加速的JSON解析，解码大响应体快2-3倍
+except ImportError:
+    orjson = None
+
+# 添加项目根目录到Python路径（仅缺失时插入，置于首位加速首方模块解析）
 project_root = os.path.dirname(os.path.abspath(__file__))
-sys.path.append(project_root)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from cmd_pilot.command_engine import CommandEngine, CommandContext
+from cmd_pilot.utils.async_executor import get_shared_executor
+from cmd_pilot.utils.security import SecurityError, analyze as analyze_command
+# 扫描函数定义在可导入模块里：spawn进程池worker重新导入时不会
+# 连带执行本入口脚本
+from cmd_pilot.utils.risk_scan import (
+    PRIVILEGE_PATTERNS as _PRIVILEGE_PATTERNS,
+    analyze_risk_cached as _analyze_risk_cached,
+    risk_tuples_to_dict as _risk_tuples_to_dict,
+)
+
+# 模块级预编译：每次API响应都要提取代码块，免去re缓存查找
+_CODE_BLOCK_RE = re.compile(r'```(?:bash|shell|powershell|cmd)?\n(.*?)```', re.DOTALL)
+# 一遍多行扫描提取非空且非噪声的命令行（噪声=shell的#与batch的
+# ::/REM/@echo），整段响应单次C级findall替代Python逐行strip+match
+_CMD_LINE_RE = re.compile(
+    r'^[ \t]*(?!#|::|REM\s|@echo\s+(?:on|off)[ \t]*$)(\S[^\n]*?)[ \t\r]*$',
+    re.IGNORECASE | re.MULTILINE
+)
+
+# 子进程输出字节流的解码编码；Windows控制台默认GBK
+_OUTPUT_ENCODING = 'gbk' if sys.platform.startswith('win') else 'utf-8'
+
+# 环境变量快照：热路径读取不再逐次遍历os.environ
+_ENV_CACHE = types.MappingProxyType(dict(os.environ))
+
+
+def refresh_env_cache():
+    """load_dotenv等写入环境后重建快照（测试亦可调用）"""
+    global _ENV_CACHE
+    _ENV_CACHE = types.MappingProxyType(dict(os.environ))
+
 
-from CMD_Pilot.cmd_pilot.core.command_engine import CommandEngine, CommandContext
-from CMD_Pilot.cmd_pilot.security import SecurityError
+@lru_cache(maxsize=1)
+def _load_env_once() -> None:
+    """进程内只解析一次.env；重复调用为空操作
+
+    dotenv在此惰性导入：--help等不触网路径省掉整个包的加载。
+    """
+    from dotenv import load_dotenv
+    load_dotenv(override=False)  # 已存在的环境变量不覆盖
+    refresh_env_cache()
+
+
+@lru_cache(maxsize=256)
+def _sanitize_text_output(text: str) -> str:
+    """提取响应中的命令部分；重复响应（重试/上游缓存）直接命中缓存"""
+    code_blocks = _CODE_BLOCK_RE.findall(text)
+    if code_blocks:
+        return code_blocks[-1].strip()
+
+    # 无代码块时回退取末尾3条有效命令行；提取整体在正则引擎内完成
+    lines = _CMD_LINE_RE.findall(text)
+    return '\n'.join(lines[-3:])
 
 # ========== 配置部分 ==========
-from CMD_Pilot.cmd_pilot.config import (
+from cmd_pilot.config import (
     MODEL_CONFIGS, 
     UI_THEME, 
     UI_STYLE, 
@@ -45,35 +104,52 @@ class EnhancedConfig:
     UI_STYLE = UI_STYLE
     DEFAULT_SETTINGS = DEFAULT_SETTINGS
     ALLOWED_COMMANDS = ALLOWED_COMMANDS
+    # 模块加载时固化一次，UI每次构建下拉框不再list(...)分配
+    _MODEL_KEYS: Tuple[str, ...] = tuple(MODEL_CONFIGS.keys())
     lock = threading.Lock()  # 添加线程锁
+    # 活动子进程集合：WeakSet免锁追踪，支持多条命令并发执行
+    _active = weakref.WeakSet()
 
     @classmethod
     @lru_cache(maxsize=32)
     def get_model_config(cls, model_id: str) -> ModelConfig:
-        """Cached config access"""
-        from copy import deepcopy
-        return deepcopy(cls.MODEL_CONFIGS.get(model_id))
+        """Cached config access（只读视图，命中即指针返回，无deepcopy）"""
+        config = cls.MODEL_CONFIGS.get(model_id)
+        if config is None:
+            return None
+        # 调用方如需可变副本请显式dict(...)
+        return types.MappingProxyType(config)
 
 # ========== 引擎部分 ==========
-        
+
+    async def _call_openai_api(self, messages: List[Dict[str, str]]) -> str:
+        """调用OpenAI兼容API（异步：网络等待期间让出事件循环）"""
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {_ENV_CACHE.get(self.config['env_vars'][0])}"
+        }
         data = {
             "model": self.config["model"],
             "messages": messages,
             "temperature": 0.3
         }
-        
-        response = requests.post(
+
+        # 复用包内共享的httpx异步客户端（连接池+keep-alive）
+        from cmd_pilot.command_engine import _get_http_client
+        response = await _get_http_client().post(
             f"{self.config['base_url']}/chat/completions",
             headers=headers,
-            json=data,
-            timeout=30
+            json=data
         )
         try:
             # 记录请求详情
             logging.debug(f"API请求: URL={self.config['base_url']}, Headers={headers}, Data={data}")
-            
+
             response.raise_for_status()
-            response_data = response.json()
+            if orjson is not None:
+                response_data = orjson.loads(response.content)
+            else:
+                response_data = response.json()
             
             # 记录完整响应
             logging.debug(f"API响应: {response_data}")
@@ -103,7 +179,7 @@ class EnhancedConfig:
                 
             return content
             
-        except requests.RequestException as e:
+        except httpx.HTTPError as e:
             error_msg = f"API请求失败: {str(e)}"
             logging.error(error_msg)
             raise RuntimeError(error_msg)
@@ -122,129 +198,163 @@ class EnhancedConfig:
         pass
 
     def _sanitize_output(self, text: Optional[str]) -> str:
-        """清理输出文本，提取命令部分"""
+        """清理输出文本，提取命令部分（非字符串输入走无缓存的薄分发）"""
         if text is None:
             return ""
         if not isinstance(text, str):
             return str(text)
-            
-        code_blocks = re.findall(r'```(?:bash|shell|powershell|cmd)?\n(.*?)```', text, re.DOTALL)
-        if code_blocks:
-            return code_blocks[-1].strip()
-        
-        lines = text.splitlines()
-        commands = [line.strip() for line in lines if line.strip() and not line.startswith('#')]
-        return '\n'.join(commands[-3:]) if commands else ""
+        return _sanitize_text_output(text)
 
     def confirm_risky_command(self, command: str) -> bool:
         risk_level = self.analyze_risk(command).keys()
         if 'critical' in risk_level:
             print(f"警告！检测到高危操作: {command}")
-            return input("确认执行？(y/N) ").lower() == 'y'
+            try:
+                return input("确认执行？(y/N) ").lower() == 'y'
+            except EOFError:
+                return False  # stdin不可交互时默认拒绝
         return True
 
     def execute(self, command: str) -> Tuple[str, int]:
+        """同步入口：提交到常驻后台事件循环，不再阻塞在communicate上"""
+        future = get_shared_executor().run_coroutine(self.execute_async(command))
+        return future.result()
+
+    async def execute_async(self, command: str, on_line=None) -> Tuple[str, int]:
+        """异步执行命令，stdout逐行读取（可经on_line流式上报UI）"""
         if not command:
             return "空命令", -1
-        
-        # 使用配置中的白名单
-        command_base = (shlex.split(command)[0] if command else '')
-        if command_base not in EnhancedConfig.ALLOWED_COMMANDS:
+
+        # 一次性分词供白名单检查与exec共用：无引号/转义时str.split
+        # 足够，含引号才走完整shlex状态机；不经任何shell解释执行
+        if '"' in command or "'" in command or '\\' in command:
+            argv = shlex.split(command)
+        else:
+            argv = command.split()
+        if not argv:
+            return "空命令", -1
+        # 使用配置中的白名单（frozenset，O(1)查询）
+        if argv[0] not in EnhancedConfig.ALLOWED_COMMANDS:
             return f"拒绝执行未授权命令: {command}", -1
-        
-        # 高危命令确认
-        if not self.confirm_risky_command(command):
+
+        # 高危命令确认：input()会一直阻塞，放到线程池等待，
+        # 共享循环上的生成/执行任务不被冻结
+        confirmed = await asyncio.get_running_loop().run_in_executor(
+            None, self.confirm_risky_command, command
+        )
+        if not confirmed:
             return "用户取消执行高危命令", -1
-        
+
         try:
             with CommandContext() as ctx:
-                with ctx:  # 确保上下文管理器正确生效
-                    with self.lock:
-                        self.current_process = subprocess.Popen(
-                            command,
-                            shell=False,  # 禁用shell执行
-                            executable='/bin/bash' if os.name == 'posix' else None,
-                            env=ctx.env,
-                            cwd=ctx.cwd,
-                            stdout=subprocess.PIPE,
-                            stderr=subprocess.PIPE,
-                            text=True
-                        )
-                    stdout, stderr = self.current_process.communicate(timeout=60)
-                    return_code = self.current_process.returncode
-                    
-                    if stderr:
-                        return stderr.strip(), return_code
-                    return stdout.strip(), return_code
-        except subprocess.TimeoutExpired:
-            self.terminate_process()
-            return "执行超时（60秒）", -1
+                proc = await asyncio.create_subprocess_exec(
+                    *argv,
+                    env=ctx.env,
+                    cwd=ctx.cwd,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                    # 1MB读缓冲：大输出少触发流控，也容得下超长单行
+                    limit=1024 * 1024
+                )
+                self._active.add(proc)
+
+                out_lines: List[str] = []
+
+                def _emit(raw: bytes):
+                    text = raw.decode(_OUTPUT_ENCODING, errors='replace').rstrip('\r')
+                    out_lines.append(text)
+                    if on_line is not None:
+                        on_line(text)
+
+                async def _drain_stdout():
+                    # 64KB块读而非逐行迭代：大输出少一个数量级的事件循环
+                    # 往返；行边界在本地切分，跨块断行用tail缝合
+                    tail = b''
+                    while True:
+                        chunk = await proc.stdout.read(65536)
+                        if not chunk:
+                            break
+                        lines = (tail + chunk).split(b'\n')
+                        tail = lines.pop()
+                        for raw in lines:
+                            _emit(raw)
+                    if tail:
+                        _emit(tail)
+
+                try:
+                    # stdout/stderr并发排空，避免管道写满死锁
+                    _, stderr_bytes, _ = await asyncio.wait_for(
+                        asyncio.gather(
+                            _drain_stdout(), proc.stderr.read(), proc.wait()
+                        ),
+                        timeout=60
+                    )
+                except asyncio.TimeoutError:
+                    self._kill(proc)
+                    await proc.wait()  # 回收，避免僵尸进程
+                    return "执行超时（60秒）", -1
+                finally:
+                    self._active.discard(proc)
+
+                stderr = stderr_bytes.decode(_OUTPUT_ENCODING, errors='replace').strip()
+                if stderr:
+                    return stderr, proc.returncode
+                if on_line is not None:
+                    # stdout已逐行流式上报，避免调用方重复展示
+                    return '', proc.returncode
+                return '\n'.join(out_lines).strip(), proc.returncode
         except Exception as e:
             return f"执行错误: {str(e)}", -1
-        finally:
-            with self.lock:
-                self.current_process = None
+
+    @staticmethod
+    def _kill(proc):
+        try:
+            proc.kill()
+        except ProcessLookupError:
+            pass  # 已退出
 
     def terminate_process(self):
-        with self.lock:
-            if self.current_process:
-                self.current_process.kill()
-                try:
-                    self.current_process.communicate(timeout=5)
-                except subprocess.TimeoutExpired:
-                    self.current_process.terminate()
-
-    PRIVILEGE_PATTERNS = {
-        'privilege_escalation': [
-            r'sudo\s+\w+',
-            r'pkexec\s+\w+',
-            r'doas\s+\w+',
-            r'Start-Process\s+.*-Verb\s+RunAs'
-        ],
-        'data_destruction': [
-            r'rm\s+-(rf|fr)',
-            r'format\s+\w+:',
-            r'dd\s+if=.*of=',
-            r'shred\s+-n',
-            r'chmod\s+0{3,4}\s'
-        ],
-        'network_operations': [
-            r'curl\s+-F\s+@',
-            r'wget\s+--post-file',
-            r'ssh\s+-o\s+StrictHostKeyChecking=no',
-            r'mount\s+.*-o\s+rw'
+        """终止所有活动子进程；逐个kill，无需全局锁"""
+        for proc in list(self._active):
+            self._kill(proc)
+
+    # 模式表与扫描函数定义在cmd_pilot.utils.risk_scan；此处保留
+    # 类属性引用供既有调用方使用
+    PRIVILEGE_PATTERNS = _PRIVILEGE_PATTERNS
+
+    # CPU密集型正则分析专用进程池；I/O仍走线程池
+    _cpu_executor = None
+
+    @classmethod
+    def _get_cpu_executor(cls):
+        if cls._cpu_executor is None:
+            with cls.lock:
+                if cls._cpu_executor is None:
+                    from concurrent.futures import ProcessPoolExecutor
+                    cls._cpu_executor = ProcessPoolExecutor(
+                        max_workers=os.cpu_count()
+                    )
+        return cls._cpu_executor
+
+    @classmethod
+    def shutdown_cpu_executor(cls):
+        """关闭CPU进程池（应用退出时调用）"""
+        if cls._cpu_executor is not None:
+            cls._cpu_executor.shutdown(wait=False)
+            cls._cpu_executor = None
+
+    def analyze_risk_batch(self, commands: List[str]) -> List[Dict[str, Dict[str, Any]]]:
+        """批量风险分析：正则扫描受GIL限制，进程池获得真并行"""
+        executor = self._get_cpu_executor()
+        return [
+            _risk_tuples_to_dict(item)
+            for item in executor.map(_analyze_risk_cached, commands, chunksize=16)
         ]
-    }
 
     def analyze_risk(self, command: str) -> Dict[str, Dict[str, Any]]:
-        results = {}
-        for level, patterns in [
-            ("critical", self.PRIVILEGE_PATTERNS['privilege_escalation']),
-            ("high", self.PRIVILEGE_PATTERNS['data_destruction']),
-            ("medium", self.PRIVILEGE_PATTERNS['network_operations'])
-        ]:
-            matched = []
-            for pattern in patterns:
-                if re.search(pattern, command, re.IGNORECASE):
-                    matched.append(pattern)
-            if matched:
-                results[level] = {
-                    "patterns": matched,
-                    "count": len(matched)
-                }
-        return results
-
-class AsyncExecutor:
-    """Helper class for async operations"""
-    def __init__(self):
-        self.loop = asyncio.new_event_loop()
-        self.executor = ThreadPoolExecutor(max_workers=4)
-
-    async def run_blocking(self, func, *args):
-        return await self.loop.run_in_executor(
-            self.executor, 
-            partial(func, *args)
-        )
+        """按命令memoize：确认弹窗与UI刷新重复分析同一命令时O(1)"""
+        return _risk_tuples_to_dict(_analyze_risk_cached(command))
+
 
 class PlaceholderText(tk.Text):
     """带placeholder提示的文本框"""
@@ -303,12 +413,29 @@ class ToolTip:
             self.tip_window = None
 
 class ModernUI(tk.Tk):
+    # 控制台保留的最大行数，超出部分从最旧处裁剪
+    _MAX_CONSOLE_LINES = 5000
+
     def __init__(self, default_model: str = "moonshot") -> None:
         super().__init__()
         self.title("智能命令助手")
         self.geometry("1000x700")
         self.default_model = default_model
-        self.async_executor = AsyncExecutor()
+        # 全应用共享的后台事件循环线程，避免每次任务新建loop
+        self._loop = get_shared_executor().loop
+        # 本地命令执行器（流式子进程），与AI引擎分离
+        self.runner = EnhancedConfig()
+        # 输出缓冲：高频流式输出合并为每批一次Tk插入/重绘
+        self._pending_out: deque = deque()
+        self._out_flush_scheduled = False
+        # 流式生成预览缓冲，start_process每轮重置
+        self._stream_parts: list = []
+        self._stream_flush_scheduled = False
+        # 子进程输出行队列：后台线程只put，主线程定时批量排空
+        self._line_q: queue.Queue = queue.Queue()
+        self._line_drain_active = False
+        # 控制台自动裁剪计数器（见_flush_output）
+        self._flush_count = 0
         
         # 先初始化样式，再设置关闭协议
         if not self._init_styles():
@@ -331,17 +458,31 @@ class ModernUI(tk.Tk):
         # 关闭线程池
         if hasattr(self, 'executor'):
             self.executor.shutdown(wait=False)
-        
+
+        # 释放各引擎的常驻执行上下文
+        if hasattr(self, '_engines'):
+            for engine in self._engines.values():
+                close = getattr(engine, 'close', None)
+                if close is not None:
+                    close()
+
+        # 释放CPU进程池
+        EnhancedConfig.shutdown_cpu_executor()
+
         # 销毁窗口
         self.destroy()
 
     @staticmethod
+    @lru_cache(maxsize=64)
     def _adjust_color(hex_color: str, delta: int) -> str:
-        """调整颜色亮度"""
-        r = max(0, min(255, int(hex_color[1:3], 16) + delta))
-        g = max(0, min(255, int(hex_color[3:5], 16) + delta))
-        b = max(0, min(255, int(hex_color[5:7], 16) + delta))
-        return f"#{r:02x}{g:02x}{b:02x}"
+        """调整颜色亮度（同色同delta的style.map调用命中缓存）"""
+        # bytes.fromhex一次解出RGB，比三次int(..., 16)少解释器开销
+        r, g, b = bytes.fromhex(hex_color[1:])
+        return "#%02x%02x%02x" % (
+            max(0, min(255, r + delta)),
+            max(0, min(255, g + delta)),
+            max(0, min(255, b + delta)),
+        )
 
     def _init_styles(self):
         """初始化样式配置"""
@@ -371,13 +512,18 @@ class ModernUI(tk.Tk):
         self.settings = self._load_settings()
         
         self.active_model = "moonshot"
-        self.executor = ThreadPoolExecutor(max_workers=1)
+        # 常驻线程池：每次点击复用，不再为单个任务付线程创建/销毁开销
+        self.executor = ThreadPoolExecutor(
+            max_workers=2, thread_name_prefix="cmdpilot"
+        )
         self.current_task: Optional[Future] = None
         self.last_command: Optional[str] = None
         self.raw_response: Optional[str] = None
-        
+        # 按模型缓存引擎实例，切换模型时复用会话/连接池
+        self._engines: 'OrderedDict[str, CommandEngine]' = OrderedDict()
+
         try:
-            self.engine = CommandEngine(self.active_model)
+            self.engine = self._get_engine(self.active_model)
         except Exception as e:
             messagebox.showerror("初始化错误", str(e))
             self.destroy()
@@ -387,18 +533,54 @@ class ModernUI(tk.Tk):
         self._setup_bindings()
         return True
 
+    def _get_engine(self, model: str) -> CommandEngine:
+        """惰性创建并LRU缓存CommandEngine（最多保留4个模型）"""
+        engine = self._engines.get(model)
+        if engine is None:
+            engine = CommandEngine(model)
+            self._engines[model] = engine
+        self._engines.move_to_end(model)
+        if len(self._engines) > 4:
+            # 被淘汰的引擎立刻释放常驻执行上下文（临时目录等）
+            _, evicted = self._engines.popitem(last=False)
+            close = getattr(evicted, 'close', None)
+            if close is not None:
+                close()
+        return engine
+
     def _load_settings(self) -> Dict[str, Any]:
-        if os.path.exists(self.config_path):
-            try:
-                with open(self.config_path, 'r') as f:
-                    return json.load(f)
-            except:
-                return EnhancedConfig.DEFAULT_SETTINGS.copy()
-        return EnhancedConfig.DEFAULT_SETTINGS.copy()
+        # EAFP：直接open省掉exists的stat调用，也消除TOCTOU窗口
+        try:
+            with open(self.config_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return EnhancedConfig.DEFAULT_SETTINGS.copy()
+        except (json.JSONDecodeError, OSError) as e:
+            logging.warning("配置加载失败: %s", e)
+            return EnhancedConfig.DEFAULT_SETTINGS.copy()
 
     def _save_settings(self) -> None:
-        with open(self.config_path, 'w') as f:
-            json.dump(self.settings, f, indent=2)
+        # 内存中一次序列化，mkstemp单次write后原子替换：
+        # 既合并json.dump的零碎写，又避免写一半被读到
+        if orjson is not None:
+            payload = orjson.dumps(self.settings, option=orjson.OPT_INDENT_2)
+        else:
+            payload = json.dumps(self.settings, indent=2).encode('utf-8')
+        fd, temp_path = tempfile.mkstemp(
+            dir=os.path.dirname(self.config_path) or '.'
+        )
+        try:
+            try:
+                os.write(fd, payload)
+            finally:
+                os.close(fd)
+            os.replace(temp_path, self.config_path)
+        except OSError:
+            try:
+                os.unlink(temp_path)
+            except FileNotFoundError:
+                pass
+            raise
 
     def _init_components(self) -> None:
         self._create_top_bar()
@@ -429,7 +611,7 @@ class ModernUI(tk.Tk):
         self.model_combobox = ttk.Combobox(
             model_frame,
             textvariable=self.model_var,
-            values=list(EnhancedConfig.MODEL_CONFIGS.keys()),
+            values=EnhancedConfig._MODEL_KEYS,
             state="readonly"
         )
         self.model_combobox.pack(side=tk.LEFT, padx=5)
@@ -623,6 +805,7 @@ class ModernUI(tk.Tk):
         self.bind("<Control-g>", lambda e: self._on_generate())
         self.bind("<Control-e>", lambda e: self._on_execute())
         self.bind("<Control-q>", lambda e: self._on_close())
+        self.bind("<Escape>", lambda e: self.stop_generation())
 
     def _update_settings(self):
         """更新设置"""
@@ -643,13 +826,12 @@ class ModernUI(tk.Tk):
                 return
                 
             self.status_var.set("处理中...")
-            self.progress.start()  # 启动进度条
+            # 80ms步进：减少主循环唤醒，让GIL多留给HTTP工作线程
+            self.progress.start(80)
             self._toggle_ui_state(False)
-            
-            # 确保有事件循环
-            if not hasattr(self, '_loop'):
-                self._loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(self._loop)
+            # 流式预览缓冲：每个新请求清空上一轮残留
+            self._stream_parts = []
+            self._stream_flush_scheduled = False
             
             # 创建并运行协程任务
             async def run_async_process():
@@ -659,7 +841,7 @@ class ModernUI(tk.Tk):
                 except Exception as e:
                     return {"error": f"处理失败: {str(e)}"}
             
-            # 使用线程安全的协程执行
+            # 提交到常驻后台循环线程执行
             self.current_task = asyncio.run_coroutine_threadsafe(
                 run_async_process(),
                 self._loop
@@ -686,7 +868,11 @@ class ModernUI(tk.Tk):
             - error: 错误信息(如果有)
         """
         try:
-            result = await self.engine.async_generate_command(query)
+            # 流式生成：token边到边预览，感知延迟从全量完成降到首token。
+            # 不支持流式的API类型由引擎内部回退为整体生成
+            result = await self.engine.async_generate_command_stream(
+                query, on_delta=self._on_stream_delta
+            )
             if not isinstance(result, dict):
                 raise ValueError("无效的API响应格式")
                 
@@ -719,7 +905,10 @@ class ModernUI(tk.Tk):
         try:
             # 停止进度条
             self.progress.stop()
-            
+
+            if future.cancelled():
+                return  # 用户取消或超时取消，状态栏已更新
+
             if future.done():
                 result = future.result()
                 
@@ -740,14 +929,15 @@ class ModernUI(tk.Tk):
                     self._append_output("内部错误: 无效的响应格式", -1)
                     return
                 
-                # 获取风险评估
-                risk = self.engine.assess_risk(result["sanitized"])
-                self._show_command(result["sanitized"], risk['level'])
-                
+                # 复用记忆化的整体分析结果：校验/执行路径已算过，
+                # 此处不再对同一命令做第二次扫描
+                analysis = analyze_command(result["sanitized"])
+                self._show_command(result["sanitized"], analysis.risk_level)
+
                 # 高风险命令额外警告
-                if risk['level'] == 'high':
+                if analysis.risk_level in ('high', 'critical'):
                     self._append_output(
-                        f"警告: 高风险命令 - {', '.join(risk['reasons'])}", 
+                        f"警告: 高风险命令 - {', '.join(analysis.reasons)}",
                         1  # 使用1表示警告级别
                     )
                 
@@ -768,14 +958,24 @@ class ModernUI(tk.Tk):
         finally:
             self._toggle_ui_state(True)
             self.progress.stop()
-            
-            # 清理事件循环
-            if hasattr(self, '_loop'):
-                self._loop.call_soon_threadsafe(self._loop.stop)
+
+    def stop_generation(self):
+        """取消在途生成任务
+
+        run_coroutine_threadsafe返回的Future取消会传导到后台循环里的
+        协程，真正中断等待中的HTTP请求并归还连接，而不只是翻个标志位。
+        """
+        task = getattr(self, 'current_task', None)
+        if task is not None and not task.done():
+            task.cancel()
+            self.status_var.set("已取消")
+            self._toggle_ui_state(True)
+            self.progress.stop()
 
     def _check_task_timeout(self):
         """检查任务是否超时"""
         if hasattr(self, 'current_task') and not self.current_task.done():
+            self.current_task.cancel()  # 中断协程，释放HTTP连接
             self.status_var.set("错误: 处理超时")
             self._append_output("处理超时，请重试", -1)
             self._toggle_ui_state(True)
@@ -793,6 +993,26 @@ class ModernUI(tk.Tk):
         self.console_text.config(state=tk.DISABLED)
         self.console_text.see(tk.END)
 
+    def _on_stream_delta(self, delta: str):
+        """流式token回调（后台循环线程调用）
+
+        只累积并防抖调度一次预览刷新，不逐token打Tcl往返。
+        """
+        self._stream_parts.append(delta)
+        if not self._stream_flush_scheduled:
+            self._stream_flush_scheduled = True
+            self.after(80, self._flush_stream_preview)
+
+    def _flush_stream_preview(self):
+        """把已到达的流式内容整体渲染进命令框（主线程）"""
+        self._stream_flush_scheduled = False
+        if not self._stream_parts:
+            return
+        self.command_text.config(state=tk.NORMAL)
+        self.command_text.delete("1.0", tk.END)
+        self.command_text.insert("1.0", ''.join(self._stream_parts))
+        self.command_text.config(state=tk.DISABLED)
+
     def _show_command(self, command: str, risk_level: str = 'low'):
         """显示生成的命令(带风险级别)
         
@@ -815,14 +1035,49 @@ class ModernUI(tk.Tk):
         self.command_text.config(state=tk.DISABLED)
 
     def _append_output(self, text: str, exit_code: int = 0):
-        """追加输出到控制台"""
-        color = "red" if exit_code != 0 else "green"
-        
+        """追加输出到控制台（入队合并，after_idle统一刷新）"""
+        self._pending_out.append((text, exit_code))
+        if not self._out_flush_scheduled:
+            self._out_flush_scheduled = True
+            # 50ms防抖窗口：持续流式输出时after_idle仍可能逐行触发，
+            # 固定窗口保证每窗口至多一次Tcl往返
+            self.after(50, self._flush_output)
+
+    def _flush_output(self):
+        """单次排空输出队列：相邻同色行合并成一次insert，一次see"""
+        self._out_flush_scheduled = False
+        if not self._pending_out:
+            return
+
         self.console_text.config(state=tk.NORMAL)
-        self.console_text.tag_config(color, foreground=color)
-        self.console_text.insert(tk.END, text + "\n", color)
+        self.console_text.tag_config("red", foreground="red")
+        self.console_text.tag_config("green", foreground="green")
+        group, group_color = [], None
+        while self._pending_out:
+            text, exit_code = self._pending_out.popleft()
+            color = "red" if exit_code != 0 else "green"
+            if group and color != group_color:
+                group.append('')  # 末尾空元素使join自带收尾换行，免二次拼接
+                self.console_text.insert(tk.END, '\n'.join(group), group_color)
+                group = []
+            group_color = color
+            group.append(text)
+        if group:
+            group.append('')
+            self.console_text.insert(tk.END, '\n'.join(group), group_color)
+        # 定期裁掉最旧行：Tk的Text是B树，内容无界增长会拖慢之后
+        # 每次insert/see；每8次刷新查一次行数即可摊薄index开销
+        self._flush_count += 1
+        if self._flush_count % 8 == 0:
+            line_count = int(self.console_text.index('end-1c').split('.')[0])
+            if line_count > self._MAX_CONSOLE_LINES:
+                self.console_text.delete(
+                    '1.0', f'{line_count - self._MAX_CONSOLE_LINES}.0'
+                )
         self.console_text.config(state=tk.DISABLED)
         self.console_text.see(tk.END)
+        # 有新输出时才处理一次空闲队列重绘；刷新节奏与50ms批处理窗口一致
+        self.update_idletasks()
 
     def _show_raw_response(self):
         """显示原始API响应"""
@@ -839,7 +1094,11 @@ class ModernUI(tk.Tk):
             font=("Consolas", 10)
         )
         text.pack(fill=tk.BOTH, expand=True)
-        text.insert(tk.END, json.dumps(self.raw_response, indent=2))
+        if orjson is not None:
+            raw = orjson.dumps(self.raw_response, option=orjson.OPT_INDENT_2).decode()
+        else:
+            raw = json.dumps(self.raw_response, indent=2)
+        text.insert(tk.END, raw)
         text.config(state=tk.DISABLED)
 
     def _on_model_change(self, event=None):
@@ -849,7 +1108,7 @@ class ModernUI(tk.Tk):
             return
         
         try:
-            self.engine = CommandEngine(model)
+            self.engine = self._get_engine(model)
             self.active_model = model
             self.status_var.set(f"已切换到模型: {EnhancedConfig.MODEL_CONFIGS[model]['name']}")
         except Exception as e:
@@ -865,9 +1124,8 @@ class ModernUI(tk.Tk):
 
     def stop_process(self):
         """停止当前进程"""
-        if hasattr(self.engine, 'terminate_process'):
-            self.engine.terminate_process()
-            self.status_var.set("进程已停止")
+        self.runner.terminate_process()
+        self.status_var.set("进程已停止")
 
     def _on_generate(self, event=None):
         """生成命令按钮回调"""
@@ -881,21 +1139,49 @@ class ModernUI(tk.Tk):
         
         self.status_var.set("执行中...")
         self._toggle_ui_state(False)
-        
-        def execute():
-            output, exit_code = self.engine.execute(self.last_command)
-            return output, exit_code
-        
-        self.current_task = self.executor.submit(execute)
-        self.current_task.add_done_callback(
-            lambda f: self._append_output(*f.result())
-        )
-        self.current_task.add_done_callback(
-            lambda _: self._toggle_ui_state(True)
-        )
-        self.current_task.add_done_callback(
-            lambda _: self.status_var.set("就绪")
+
+        # 流式执行：stdout逐行入线程安全队列，主线程~60Hz统一排空。
+        # 每行一个after(0)的Tcl事件开销由此合并为每tick一次
+        coro = self.runner.execute_async(
+            self.last_command,
+            on_line=self._line_q.put
         )
+        self.current_task = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        self.current_task.add_done_callback(self._on_execute_done)
+        self._start_line_drain()
+
+    def _start_line_drain(self):
+        """启动行队列轮询（空转时自动停，不常驻消耗主循环）"""
+        if not self._line_drain_active:
+            self._line_drain_active = True
+            self.after(16, self._drain_lines)
+
+    def _drain_lines(self):
+        """单tick排空行队列，批量追加后按任务状态决定是否续期"""
+        while True:
+            try:
+                line = self._line_q.get_nowait()
+            except queue.Empty:
+                break
+            self._append_output(line, 0)
+        task = self.current_task
+        if (task is not None and not task.done()) or not self._line_q.empty():
+            self.after(16, self._drain_lines)
+        else:
+            self._line_drain_active = False
+
+    def _on_execute_done(self, future) -> None:
+        """执行结束回调（后台线程触发，UI更新全部经after转主线程）"""
+        try:
+            output, exit_code = future.result()
+        except Exception as e:
+            output, exit_code = f"执行错误: {e}", -1
+        # stdout已流式追加（此时output为空），这里补报错误输出
+        # 以及rc==0但写了stderr的告警类输出
+        if output:
+            self.after(0, self._append_output, output, exit_code)
+        self.after(0, self._toggle_ui_state, True)
+        self.after(0, self.status_var.set, "就绪")
 
 # ========== 主程序入口 ==========
 def setup_logging():
@@ -909,21 +1195,32 @@ def setup_logging():
         ]
     )
 
+# 导入时求值一次，check_config不再每次遍历MODEL_CONFIGS
+_REQUIRED_VARS = frozenset().union(
+    *(config['env_vars'] for config in MODEL_CONFIGS.values())
+)
+
+
+@lru_cache(maxsize=None)
 def check_config():
-    """检查必要配置"""
-    required_vars = set()
-    for config in EnhancedConfig.MODEL_CONFIGS.values():
-        required_vars.update(config['env_vars'])
-    
-    missing = [var for var in required_vars if not os.getenv(var)]
+    """检查必要配置（进程内环境稳定，结果可缓存）"""
+    missing = [var for var in _REQUIRED_VARS if not _ENV_CACHE.get(var)]
     if missing:
         raise EnvironmentError(f"缺少必需环境变量: {', '.join(missing)}")
 
 def parse_args():
-    """解析命令行参数"""
+    """解析命令行参数
+
+    无参数启动（最常见）直接返回默认值，argparse的导入与
+    解析器构建整个跳过。
+    """
+    if len(sys.argv) == 1:
+        return types.SimpleNamespace(debug=False, model='moonshot')
+
+    import argparse
     parser = argparse.ArgumentParser(description='AI命令行助手')
     parser.add_argument('--debug', action='store_true', help='启用调试模式')
-    parser.add_argument('--model', choices=EnhancedConfig.MODEL_CONFIGS.keys(), 
+    parser.add_argument('--model', choices=EnhancedConfig.MODEL_CONFIGS.keys(),
                        default='moonshot', help='选择AI模型')
     return parser.parse_args()
 
@@ -931,8 +1228,8 @@ def main():
     """主程序入口"""
     args = parse_args()
     setup_logging()
-    load_dotenv()
-    
+    _load_env_once()
+
     try:
         check_config()
         app = ModernUI(default_model=args.model)